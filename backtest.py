@@ -0,0 +1,28 @@
+import argparse
+
+from common.sessions import backtest_config, session_candles, session_config
+from routes import extra_candles, routes
+
+# Backtests the routes of routes.py with jesse's research backtest, loading the warmup their
+# strategies need, e.g.:
+# python backtest.py 2021-01-01 2021-04-01
+
+parser = argparse.ArgumentParser(description='Backtest the routes with the warmup of their strategies.')
+parser.add_argument('start_date')
+parser.add_argument('finish_date')
+args = parser.parse_args()
+
+# Imported here, jesse.research connects to the database on import.
+from jesse import research
+
+# The warmup of the hyperparameter ranges of the route strategies, see common.warmup.
+config = backtest_config(session_config(routes))
+candles, warmup_candles = session_candles(routes, args.start_date, args.finish_date, config['warm_up_candles'])
+
+result = research.backtest(
+    config, [{'exchange': e, 'symbol': s, 'timeframe': t, 'strategy': strategy} for e, s, t, strategy in routes],
+    [{'exchange': e, 'symbol': s, 'timeframe': t} for e, s, t in extra_candles], candles, warmup_candles=warmup_candles)
+
+print(f"Warmup: {config['warm_up_candles']} candles")
+for name, value in result['metrics'].items():
+    print(f'{name}: {value}')
@@ -0,0 +1,91 @@
+import argparse
+from pathlib import Path
+
+import jesse.helpers as jh
+import numpy as np
+import pandas as pd
+
+from common.astro_signals import SignalVersions
+from common.batch_backtest import AstroMABatch
+from common.intrabar import bar_candles
+from common.optimization import canonical_key, random_candidates
+from common.sessions import session_candles, session_config
+from common.worker_pool import BatchPool
+from routes import routes
+from strategies import strategy_class
+
+# Random search of the AstroStrategyMA hyperparameters of a route with the batch backtest engine. The
+# rounds of candidates run on the same forked workers over the training period, then the best ones
+# are backtested over the testing period, e.g.:
+# python batch_search.py 2020-01-01 2021-01-01 2021-04-01 --candidates 2000 --rounds 5 --cpu 4
+
+parser = argparse.ArgumentParser(description='Search the AstroStrategyMA hyperparameters with the batch engine.')
+parser.add_argument('training_start_date')
+parser.add_argument('testing_start_date')
+parser.add_argument('finish_date')
+parser.add_argument('--route', type=int, default=0, help='index of the route in routes.py')
+parser.add_argument('--candidates', type=int, default=1000, help='candidates per round')
+parser.add_argument('--rounds', type=int, default=5)
+parser.add_argument('--cpu', type=int, help='worker processes, one per CPU core by default')
+parser.add_argument('--top', type=int, default=20, help='candidates backtested over the testing period')
+parser.add_argument('--seed', type=int)
+args = parser.parse_args()
+
+route = routes[args.route]
+exchange, symbol, timeframe, strategy = route
+if strategy != 'AstroStrategyMA':
+    parser.error(f'The batch engine simulates AstroStrategyMA, route {args.route} runs {strategy}.')
+
+session = session_config([route])
+signals_path = Path(__file__).parent / 'strategies' / strategy / f"ml-{symbol.split('-')[0]}-USD-daily-index.csv"
+astro_asset = pd.read_csv(signals_path, parse_dates=['Date'], index_col=0)
+# The vintages recorded by record_signal_versions.py, the current signals without them.
+versions = SignalVersions.load(SignalVersions.key_of(signals_path))
+
+
+def period_batch(start_date: str, finish_date: str) -> tuple:
+    # Batch of the period and its warmup, and the index of the first candle of the period.
+    candles, warmup_candles = session_candles([route], start_date, finish_date, session['warm_up_candles'])
+    key = jh.key(exchange, symbol)
+    minute_candles = np.concatenate((warmup_candles[key]['candles'], candles[key]['candles']))
+    bars = bar_candles(minute_candles, jh.timeframe_to_one_minutes(timeframe))
+    batch = AstroMABatch(bars, astro_asset, capital=session['exchange']['balance'], fee_rate=session['exchange']['fee'],
+                         warmup_candles_num=session['warm_up_candles'], minute_candles=minute_candles, versions=versions)
+    return batch, int(np.searchsorted(bars[:, 0], candles[key]['candles'][0, 0]))
+
+
+def report(candidates: list, result) -> pd.DataFrame:
+    capital = session['exchange']['balance']
+    frame = pd.DataFrame(candidates)
+    frame.insert(0, 'net_profit_percentage', (result.balance - capital) / capital * 100)
+    frame.insert(1, 'trades', result.trades)
+    frame.insert(2, 'win_rate', np.divide(result.wins, result.trades, out=np.zeros(len(candidates)),
+                                          where=result.trades > 0))
+    return frame
+
+
+strategy_type = strategy_class(strategy)
+rng = np.random.default_rng(args.seed)
+searched = set()
+reports = []
+training, training_start = period_batch(args.training_start_date, args.testing_start_date)
+with BatchPool(training, args.cpu) as pool:
+    for n in range(args.rounds):
+        candidates = [hp for hp in random_candidates(strategy_type, args.candidates, rng)
+                      if canonical_key(hp, strategy_type) not in searched]
+        if not candidates:
+            continue
+        searched.update(canonical_key(hp, strategy_type) for hp in candidates)
+        reports.append(report(candidates, pool.run(candidates, training_start)))
+        best = max(frame['net_profit_percentage'].max() for frame in reports)
+        print(f'Round {n + 1}: {len(candidates)} new candidates, {len(searched)} searched, best {best:.2f}%')
+
+metrics = ['net_profit_percentage', 'trades', 'win_rate']
+training_report = pd.concat(reports, ignore_index=True).nlargest(args.top, 'net_profit_percentage')
+top = training_report.drop(columns=metrics).to_dict('records')
+testing, testing_start = period_batch(args.testing_start_date, args.finish_date)
+testing_report = report(top, testing.run(top, testing_start))
+
+print(pd.concat({'training': training_report[metrics].reset_index(drop=True), 'testing': testing_report[metrics]},
+                axis=1).round(2).to_string())
+print(f'\nBest hyperparameters:\n{pd.DataFrame(top).to_string()}')
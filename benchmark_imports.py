@@ -0,0 +1,42 @@
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from strategies import STRATEGIES
+
+# Import time of each strategy module in a fresh interpreter and the heavy dependencies it loads, e.g.:
+# python benchmark_imports.py --repeat 5
+# jesse.strategies is the baseline every strategy module pays for, the difference is theirs.
+
+HEAVY = ('pandas', 'ephem', 'requests', 'scipy', 'talib', 'jesse.indicators')
+CODE = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(' '.join(name for name in {heavy} if name in sys.modules))
+'''
+
+parser = argparse.ArgumentParser(description='Benchmark the cold import time of the strategies.')
+parser.add_argument('modules', nargs='*', default=['strategies', 'jesse.strategies'] + [f'strategies.{name}' for name in STRATEGIES])
+parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters per module, the fastest one is kept')
+parser.add_argument('--no-db', action='store_true',
+                    help="import jesse the way its test runner does, without the database connection")
+args = parser.parse_args()
+env = dict(os.environ, PYTEST_CURRENT_TEST='benchmark_imports') if args.no_db else None
+
+print(f"{'module':<32}{'seconds':>9}  loaded")
+for module in args.modules:
+    timings = []
+    for _ in range(args.repeat):
+        result = subprocess.run([sys.executable, '-c', CODE.format(module=module, heavy=HEAVY)],
+                                cwd=Path(__file__).parent, env=env, capture_output=True, text=True)
+        if result.returncode:
+            print(f'{module:<32}{"failed":>9}  {result.stderr.strip().splitlines()[-1]}')
+            break
+        seconds, loaded = result.stdout.splitlines()[-2:]
+        timings.append(float(seconds))
+    else:
+        print(f'{module:<32}{min(timings):>9.3f}  {loaded or "-"}')
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import jesse.helpers as jh
+import numpy as np
+import pandas as pd
+
+from common.astro_signals import AstroSignals
+
+DAY_MS = 86_400_000
+HOUR_MS = 3_600_000
+ACCURACY_PATH = Path(__file__).parent.parent / 'storage' / 'astro_accuracy'
+STRATEGIES_PATH = Path(__file__).parent.parent / 'strategies'
+
+ASSETS = ('ADA', 'BAT', 'BNB', 'BTC', 'DASH', 'EOS', 'ETC', 'ETH', 'LINK', 'LTC', 'XLM', 'XMR', 'XRP', 'ZEC', 'ZRX')
+
+
+def hourly_opens(candles: np.ndarray, first_day: int, last_day: int) -> np.ndarray:
+    # (days, 24) open prices of 1h candles, NaN where a candle is missing.
+    opens = np.full((last_day - first_day + 1) * 24, np.nan)
+    hours = candles[:, 0].astype(np.int64) // HOUR_MS - first_day * 24
+    inside = (hours >= 0) & (hours < len(opens))
+    opens[hours[inside]] = candles[inside, 1]
+    return opens.reshape(-1, 24)
+
+
+def load_hourly_opens(exchange: str, symbol: str, first_day: int, last_day: int) -> np.ndarray:
+    # The hourly opens are cached per range, a signals refresh doesn't need the candles again.
+    path = ACCURACY_PATH / f'{exchange}-{symbol}-{first_day}-{last_day}.npy'
+    if path.exists():
+        return np.load(path)
+
+    # Imported here, jesse.research connects to the database on import and cached runs don't need it.
+    from jesse.research import get_candles
+
+    _, candles = get_candles(exchange, symbol, '1h', first_day * DAY_MS, (last_day + 1) * DAY_MS - 1)
+    opens = hourly_opens(candles, first_day, last_day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(path, opens)
+    return opens
+
+
+def evaluate(opens: np.ndarray, first_day: int, signals: list, assets: list, trend_periods=range(1, 6)) -> pd.DataFrame:
+    # Hit rates of the astro signal decisions against the price direction for every asset, month,
+    # shift hour and trend period at once.
+    #
+    # opens is (assets, days, 24). With astro_signal_shift_hour H the strategy trades the candles
+    # from day D H:00 to day D + 1 H:00 on decision(D, 1, trend_period), so that decision is hit
+    # when it has the sign of the open-to-open return over those 24 hours.
+    trend_periods = list(trend_periods)
+    days = first_day + np.arange(opens.shape[1] - 1)
+
+    returns = opens[:, 1:, :] / opens[:, :-1, :] - 1
+    direction = np.sign(np.nan_to_num(returns)).astype(np.int8)
+
+    decisions = np.stack([np.stack([asset_signals.decisions(days, 1, period) for period in trend_periods], axis=-1)
+                          for asset_signals in signals])
+    # Days after the end of the signals would count as buy decisions over an empty window.
+    for i, asset_signals in enumerate(signals):
+        decisions[i, days + 1 > asset_signals.days[-1]] = 0
+
+    # (assets, days, shift hours, trend periods)
+    decided = (decisions[:, :, None, :] != 0) & (direction[:, :, :, None] != 0)
+    hits = decided & (decisions[:, :, None, :] == direction[:, :, :, None])
+
+    months = days.astype('datetime64[D]').astype('datetime64[M]')
+    month_starts = np.flatnonzero(np.concatenate(([True], months[1:] != months[:-1])))
+    signals_count = np.add.reduceat(decided, month_starts, axis=1)
+    hits_count = np.add.reduceat(hits, month_starts, axis=1)
+
+    index = pd.MultiIndex.from_product([list(assets), months[month_starts], range(24), trend_periods],
+                                       names=['asset', 'month', 'shift_hour', 'trend_period'])
+    report = pd.DataFrame({'signals': signals_count.ravel(), 'hits': hits_count.ravel()}, index=index)
+    report['hit_rate'] = report['hits'] / report['signals'].where(report['signals'] > 0)
+    return report
+
+
+def evaluate_assets(exchange: str, start_date: str, finish_date: str, assets=ASSETS,
+                    trend_periods=range(1, 6)) -> pd.DataFrame:
+    first_day = jh.date_to_timestamp(start_date) // DAY_MS
+    last_day = jh.date_to_timestamp(finish_date) // DAY_MS
+
+    opens = np.stack([load_hourly_opens(exchange, f'{asset}-USDT', first_day, last_day) for asset in assets])
+    signals = [AstroSignals.read_csv(STRATEGIES_PATH / 'AstroStrategyMA' / f'ml-{asset}-USD-daily-index.csv')
+               for asset in assets]
+    return evaluate(opens, first_day, signals, assets, trend_periods)
@@ -0,0 +1,79 @@
+import jesse.helpers as jh
+import numpy as np
+
+DAY_MS = 86_400_000
+HOUR_MS = 3_600_000
+
+
+class TimeframeAlignment:
+    # Precomputed mapping of the trading candle positions to their enclosing anchor candle
+    # (the 1D extra candles) and to the rows of day keyed calendars (astro signals, BaZi).
+    # Candles are contiguous in jesse so position N is always first_timestamp + N * timeframe,
+    # and the strategies can use integer offsets instead of converting timestamps.
+    # Everything is decoded vectorized with UTC semantics, like the candles jesse stores.
+
+    def __init__(self, first_timestamp: float, timeframe: str, anchor_timeframe: str = '1D', size: int = 4096):
+        self.first_timestamp = int(first_timestamp)
+        self.timeframe_ms = jh.timeframe_to_one_minutes(timeframe) * 60_000
+        self.anchor_ms = jh.timeframe_to_one_minutes(anchor_timeframe) * 60_000
+
+        # Until the anchor candles are known assume they start at the boundary enclosing the first candle.
+        self.anchor_first_timestamp = self.first_timestamp - self.first_timestamp % self.anchor_ms
+
+        self.first_day = self.first_timestamp // DAY_MS
+        self.days = None
+        self.hours = None
+        self.anchors = None
+        self.date_keys = None
+        self.calendars = {}
+        self.extend(size)
+
+    def extend(self, size: int):
+        timestamps = self.first_timestamp + np.arange(size, dtype=np.int64) * self.timeframe_ms
+        self.days = timestamps // DAY_MS
+        self.hours = (timestamps // HOUR_MS) % 24
+        self.anchors = (timestamps - self.anchor_first_timestamp) // self.anchor_ms
+        days = np.arange(self.first_day, self.days[-1] + 1).astype('datetime64[D]')
+        self.date_keys = np.datetime_as_string(days)
+
+    def set_anchor(self, anchor_first_timestamp: float):
+        self.anchor_first_timestamp = int(anchor_first_timestamp)
+        self.extend(len(self.days))
+
+    def ensure(self, position: int):
+        # Live sessions grow past the precomputed range, double it when needed.
+        if position >= len(self.days):
+            self.extend(max(position + 1, 2 * len(self.days)))
+
+    def position_of(self, timestamp: float) -> int:
+        return int((timestamp - self.first_timestamp) // self.timeframe_ms)
+
+    def day(self, position: int) -> int:
+        self.ensure(position)
+        return int(self.days[position])
+
+    def hour(self, position: int) -> int:
+        self.ensure(position)
+        return int(self.hours[position])
+
+    def date_key(self, position: int) -> str:
+        # ISO date (YYYY-MM-DD) of the candle.
+        return str(self.date_keys[self.day(position) - self.first_day])
+
+    def anchor_position(self, position: int) -> int:
+        self.ensure(position)
+        return int(self.anchors[position])
+
+    def add_calendar(self, name: str, dates):
+        # For each day the row of the first calendar date on or after it, like calendar.loc[day:].
+        calendar_days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+        last_day = max(int(calendar_days[-1]) + 1, self.first_day)
+        days = np.arange(self.first_day, last_day + 1, dtype=np.int64)
+        self.calendars[name] = np.searchsorted(calendar_days, days).astype(np.int32), len(calendar_days)
+
+    def calendar_row(self, name: str, position: int) -> int:
+        rows, size = self.calendars[name]
+        offset = self.day(position) - self.first_day
+        if offset >= len(rows):
+            return size
+        return int(rows[offset])
@@ -0,0 +1,330 @@
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import jesse.helpers as jh
+import numpy as np
+import pandas as pd
+from jesse.services import logger
+
+ACTIONS = {'buy': 1, 'sell': -1}
+# Longest astro_signal_trend_period with precomputed vote margins.
+MAX_TREND_PERIOD = 5
+VERSIONS_PATH = Path(__file__).parent.parent / 'storage' / 'signal_versions'
+COLUMNS = ('days', 'buy', 'sell', 'action')
+
+
+class AstroSignals:
+    # Compiled, read only version of a ml-*-USD-daily-index.csv signals file. The rows of each
+    # day and the cumulative buy/sell counts are precomputed so a period decision is O(1).
+
+    def __init__(self, days: np.ndarray, buy: np.ndarray, sell: np.ndarray, action: np.ndarray):
+        self.days = days
+        self.buy = buy
+        self.sell = sell
+        self.action = action
+        self.buy_cumsum = np.concatenate(([0], np.cumsum(action == 1)))
+        self.sell_cumsum = np.concatenate(([0], np.cumsum(action == -1)))
+
+        # Row of the first signal on or after each day, like astro_asset.loc[day:].
+        self.first_day = int(days[0])
+        self.rows = np.searchsorted(days, np.arange(self.first_day, days[-1] + 2)).astype(np.int32)
+
+        # Vote margin (buy - sell) of each row and, per trend period, the weakest absolute margin and
+        # the summed margin of the window starting at each row. The extra last entry is the empty window.
+        self.margin = (buy.astype(np.int16) - sell).astype(np.int8)
+        strength = np.abs(self.margin)
+        # Windows running past the last row only see the rows they have.
+        padded = np.concatenate((strength, np.full(MAX_TREND_PERIOD, np.iinfo(np.int8).max, dtype=np.int8)))
+        margin_cumsum = np.concatenate(([0], np.cumsum(self.margin), np.full(MAX_TREND_PERIOD, self.margin.sum())))
+
+        starts = np.arange(len(strength) + 1)
+        self.window_min_margin = np.empty((MAX_TREND_PERIOD, len(starts)), dtype=np.int8)
+        self.window_sum_margin = np.empty((MAX_TREND_PERIOD, len(starts)), dtype=np.int8)
+        window_min = padded[starts]
+        for period in range(1, MAX_TREND_PERIOD + 1):
+            window_min = np.minimum(window_min, padded[starts + period - 1])
+            self.window_min_margin[period - 1] = window_min
+            self.window_sum_margin[period - 1] = margin_cumsum[starts + period] - margin_cumsum[starts]
+        self.window_min_margin[:, -1] = 0
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame):
+        missing = {'buy', 'sell', 'Action'} - set(frame.columns)
+        if missing:
+            raise ValueError(f"Astro signals are missing the columns: {sorted(missing)}")
+        if frame.empty:
+            raise ValueError("Astro signals are empty.")
+        if not frame.index.is_monotonic_increasing or not frame.index.is_unique:
+            raise ValueError("Astro signals dates must be unique and sorted.")
+        unknown = set(frame['Action']) - set(ACTIONS)
+        if unknown:
+            raise ValueError(f"Unknown astro signal actions: {sorted(map(str, unknown))}")
+        if frame[['buy', 'sell']].isna().any().any():
+            raise ValueError("Astro signals votes can't be empty.")
+
+        days = frame.index.values.astype('datetime64[D]').astype(np.int64)
+        action = frame['Action'].map(ACTIONS).values.astype(np.int8)
+        return cls(days, frame['buy'].values.astype(np.int16), frame['sell'].values.astype(np.int16), action)
+
+    @classmethod
+    def read_csv(cls, path):
+        return cls.from_frame(pd.read_csv(path, parse_dates=['Date'], index_col=0))
+
+    def row(self, day: int) -> int:
+        offset = day - self.first_day
+        if offset < 0:
+            return 0
+        if offset >= len(self.rows):
+            return len(self.days)
+        return int(self.rows[offset])
+
+    def decision(self, day: int, start_index: int, trend_period: int) -> str:
+        # Same result as astro_signal_period_decision() over the next N signals of the day.
+        size = len(self.days)
+        start = min(self.row(day) + start_index, size)
+        end = min(start + trend_period, size)
+        count = end - start
+
+        if self.buy_cumsum[end] - self.buy_cumsum[start] == count:
+            return 'buy'
+        elif self.sell_cumsum[end] - self.sell_cumsum[start] == count:
+            return 'sell'
+
+        return 'neutral'
+
+    def margins(self, day: int, start_index: int, trend_period: int) -> tuple:
+        # (weakest absolute vote margin, summed vote margin) of the decision() window, up to MAX_TREND_PERIOD.
+        start = min(self.row(day) + start_index, len(self.days))
+        return int(self.window_min_margin[trend_period - 1, start]), int(self.window_sum_margin[trend_period - 1, start])
+
+    def decisions(self, days: np.ndarray, start_index: int, trend_period: int) -> np.ndarray:
+        # Vectorized decision() for many day numbers as 1 (buy), -1 (sell) or 0 (neutral).
+        size = len(self.days)
+        offsets = np.asarray(days, dtype=np.int64) - self.first_day
+        rows = self.rows[np.clip(offsets, 0, len(self.rows) - 1)]
+        rows = np.where(offsets < 0, 0, np.where(offsets >= len(self.rows), size, rows))
+        start = np.minimum(rows + start_index, size)
+        end = np.minimum(start + trend_period, size)
+        count = end - start
+
+        is_buy = (self.buy_cumsum[end] - self.buy_cumsum[start]) == count
+        is_sell = (self.sell_cumsum[end] - self.sell_cumsum[start]) == count
+        return np.where(is_buy, 1, np.where(is_sell, -1, 0)).astype(np.int8)
+
+
+def signal_rows(signals: AstroSignals) -> dict:
+    return {column: getattr(signals, column) for column in COLUMNS}
+
+
+def diff_rows(previous: dict, current: dict) -> dict:
+    # Rows of current that are new or changed, plus the removed days of previous with action 0.
+    shared, previous_rows, current_rows = np.intersect1d(previous['days'], current['days'], return_indices=True)
+    changed = np.ones(len(current['days']), dtype=bool)
+    changed[current_rows] = False
+    for column in COLUMNS[1:]:
+        changed[current_rows[previous[column][previous_rows] != current[column][current_rows]]] = True
+
+    removed = ~np.isin(previous['days'], current['days'])
+    delta = {column: np.concatenate((current[column][changed], previous[column][removed])) for column in COLUMNS}
+    delta['action'][changed.sum():] = 0
+    return delta
+
+
+def apply_rows(previous: dict, delta: dict) -> dict:
+    kept = ~np.isin(previous['days'], delta['days'])
+    added = delta['action'] != 0
+    merged = {column: np.concatenate((previous[column][kept], delta[column][added])) for column in COLUMNS}
+    order = np.argsort(merged['days'], kind='stable')
+    return {column: values[order] for column, values in merged.items()}
+
+
+# Watcher threads of this process take the lock, other processes wait on the file lock.
+record_lock = threading.Lock()
+
+
+@contextmanager
+def versions_lock(key: str):
+    VERSIONS_PATH.mkdir(parents=True, exist_ok=True)
+    with record_lock, open(VERSIONS_PATH / f'{key}.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+class SignalVersions:
+    # Every published version (vintage) of one ml-*-USD-daily-index.csv file. The first vintage is
+    # stored in full and the next ones only as the rows that changed, so the history stays small.
+    # at(timestamp) gives the signals as they were known at that time, backtests use it to avoid
+    # looking at forecasts of models refitted on later data.
+
+    def __init__(self, key: str, published: np.ndarray, offsets: np.ndarray, deltas: dict):
+        self.key = key
+        self.published = published
+        self.offsets = offsets
+        self.deltas = deltas
+        self.vintages = []
+
+        rows = {column: self.deltas[column][:0] for column in COLUMNS}
+        for i in range(len(published)):
+            delta = {column: values[offsets[i]:offsets[i + 1]] for column, values in deltas.items()}
+            rows = apply_rows(rows, delta)
+            self.vintages.append(AstroSignals(**rows))
+
+    @classmethod
+    def key_of(cls, source) -> str:
+        # Every strategy directory ships its own copy of the same file names, so the strategy is in the key.
+        source = Path(source).resolve()
+        return f'{source.parent.name}-{source.stem}'
+
+    @classmethod
+    def path_of(cls, key: str) -> Path:
+        return VERSIONS_PATH / f'{key}.npz'
+
+    @classmethod
+    def load(cls, key: str):
+        path = cls.path_of(key)
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            return cls(key, data['published'], data['offsets'], {column: data[column] for column in COLUMNS})
+
+    def save(self):
+        path = self.path_of(self.key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Atomic, readers never see a half written history.
+        temp_path = path.with_suffix('.tmp')
+        with open(temp_path, 'wb') as f:
+            np.savez_compressed(f, published=self.published, offsets=self.offsets, **self.deltas)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def record(cls, source, signals: AstroSignals, published: int):
+        # Adds the signals of the source file as the vintage published at the timestamp, unless
+        # nothing changed.
+        key = cls.key_of(source)
+        with versions_lock(key):
+            versions = cls.load(key)
+            current = signal_rows(signals)
+            if versions is None:
+                versions = cls(key, np.array([published], dtype=np.int64), np.array([0, len(signals.days)]), current)
+                versions.save()
+                return versions
+
+            if published <= versions.published[-1]:
+                raise ValueError(f"{key} already has a vintage published after {published}.")
+            delta = diff_rows(signal_rows(versions.vintages[-1]), current)
+            if not len(delta['days']):
+                return versions
+
+            deltas = {column: np.concatenate((versions.deltas[column], delta[column])) for column in COLUMNS}
+            versions = cls(key, np.append(versions.published, published),
+                           np.append(versions.offsets, versions.offsets[-1] + len(delta['days'])), deltas)
+            versions.save()
+            return versions
+
+    def at(self, timestamp: float):
+        # Latest vintage published at the timestamp, None before the first one was published.
+        index = int(np.searchsorted(self.published, timestamp, side='right')) - 1
+        return self.vintages[index] if index >= 0 else None
+
+
+class AstroSignalStore:
+    # Holds the compiled signals of one asset. A watcher thread recompiles the file (or its
+    # copy in a drop directory) when it changes and refresh() swaps the new version in
+    # between candles, so live sessions pick up the refreshed signals without a restart.
+
+    def __init__(self, path, drop_dir=None):
+        self.path = Path(path)
+        self.drop_dir = Path(drop_dir) if drop_dir else None
+        self.signals = AstroSignals.read_csv(self.path)
+        self.latest = self.signals
+        self.versions = SignalVersions.load(SignalVersions.key_of(self.path))
+        self.mtimes = {source: self.mtime(source) for source in self.sources()}
+        self.watcher = None
+        self.stopped = threading.Event()
+
+    def sources(self) -> list:
+        sources = [self.path]
+        if self.drop_dir:
+            sources.append(self.drop_dir / self.path.name)
+        return sources
+
+    @staticmethod
+    def mtime(source: Path):
+        try:
+            return source.stat().st_mtime
+        except OSError:
+            return None
+
+    def check(self):
+        for source in self.sources():
+            mtime = self.mtime(source)
+            if mtime is None or mtime == self.mtimes.get(source):
+                continue
+
+            self.mtimes[source] = mtime
+            try:
+                self.latest = AstroSignals.read_csv(source)
+                logger.info(f"Compiled new astro signals from {source}")
+            except (OSError, ValueError, pd.errors.ParserError) as e:
+                logger.error(f"Invalid astro signals in {source}, keeping the current version: {e}")
+                continue
+
+            # Keep the refit in the history for the vintage correct backtests.
+            published = int(mtime * 1000)
+            if self.versions is None or published > self.versions.published[-1]:
+                try:
+                    self.versions = SignalVersions.record(self.path, self.latest, published)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Couldn't record the astro signals vintage of {source}: {e}")
+
+    def watch(self, interval: float = 60):
+        if self.watcher:
+            return
+
+        def run():
+            while not self.stopped.wait(interval):
+                # Nothing may stop the watcher, it's the only way the live routes get new signals.
+                try:
+                    self.check()
+                except Exception as e:
+                    logger.error(f"Checking the astro signals of {self.path} failed: {e}")
+
+        self.watcher = threading.Thread(target=run, name=f'astro-signals-{self.path.name}', daemon=True)
+        self.watcher.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def signals_at(self, timestamp: float) -> AstroSignals:
+        # Backtests read the vintage published before the candle, so they never see the forecasts
+        # of later refits. Live sessions and files without history use the current signals.
+        if self.versions is None or jh.is_live():
+            return self.signals
+        signals = self.versions.at(timestamp)
+        if signals is None:
+            raise ValueError(f"No vintage of {self.path.name} was published by {jh.timestamp_to_time(timestamp)}, "
+                             f"the backtest would read forecasts made after the candle.")
+        return signals
+
+    def refresh(self) -> bool:
+        latest = self.latest
+        if latest is self.signals:
+            return False
+        self.signals = latest
+        return True
+
+
+# Routes reading the same file share the store.
+stores = {}
+
+
+def astro_signal_store(path, watch: bool = False, drop_dir=None) -> AstroSignalStore:
+    key = Path(path).resolve()
+    if key not in stores:
+        stores[key] = AstroSignalStore(path, drop_dir=drop_dir)
+    if watch:
+        stores[key].watch()
+    return stores[key]
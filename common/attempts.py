@@ -0,0 +1,25 @@
+import numpy as np
+
+
+class EntryAttempts:
+    # Daily entry attempts counter that only keeps the current day, so long live sessions
+    # don't grow it. Pass first_day and days to also keep an int16 history per day number.
+
+    def __init__(self, first_day: int = 0, days: int = 0):
+        self.day = -1
+        self.count = 0
+        self.first_day = first_day
+        self.history = np.zeros(days, dtype=np.int16) if days else None
+
+    def increase(self, day: int):
+        if day != self.day:
+            self.day = day
+            self.count = 0
+
+        self.count += 1
+
+        if self.history is not None and 0 <= day - self.first_day < len(self.history):
+            self.history[day - self.first_day] = self.count
+
+    def exceeded(self, day: int, limit: int) -> bool:
+        return day == self.day and self.count >= limit
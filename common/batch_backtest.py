@@ -0,0 +1,293 @@
+from collections import namedtuple
+
+import jesse.helpers as jh
+import jesse.indicators as ta
+import numpy as np
+import pandas as pd
+
+from common.astro_signals import AstroSignals, SignalVersions
+from common.intrabar import IntrabarCandles
+
+BatchResult = namedtuple('BatchResult', ['balance', 'trades', 'wins', 'log'])
+
+DAY_MS = 86_400_000
+HOUR_MS = 3_600_000
+
+
+def floor_with_precision(values: np.ndarray, precision: int) -> np.ndarray:
+    temp = 10 ** precision
+    return np.floor(values * temp) / temp
+
+
+class WindowedIndicator:
+    # Non sequential jesse indicators only see the last warmup_candles_num candles, so the
+    # value at bar i is computed on that window and shared by all the candidates asking for it.
+
+    def __init__(self, indicator, candles: np.ndarray, window: int):
+        self.indicator = indicator
+        self.candles = candles
+        self.window = window
+        self.values = {}
+
+    def at(self, i: int, period: int) -> float:
+        key = (i, period)
+        if key not in self.values:
+            start = max(0, i + 1 - self.window)
+            self.values[key] = self.indicator(self.candles[start:i + 1], period=period)
+        return self.values[key]
+
+    def gather(self, i: int, periods: np.ndarray) -> np.ndarray:
+        result = np.empty(len(periods))
+        for period in np.unique(periods):
+            result[periods == period] = self.at(i, int(period))
+        return result
+
+
+class AstroMABatch:
+    # Simulates N AstroStrategyMA hyperparameter candidates at once over the same candles.
+    #
+    # Each bar is processed like the jesse strategy does at candle close: pending stop-entry
+    # orders of the previous bar are filled or cancelled (should_cancel is always True), open
+    # positions hit their stop-loss / take-profit, update_position() runs and finally
+    # should_short() / should_long() place the next entry. The per candidate state (position,
+    # entry, stop, take-profit, attempts) lives in arrays so every step is vectorized over N.
+    #
+    # Known limits of the 15m resolution: exits are checked from the bar after the fill and the
+    # stop-loss wins when stop and take-profit are both inside the same bar. Given minute_candles,
+    # fills and exits are resolved on the 1m candles of each bar in the order they were reached,
+    # only a stop and take-profit inside the same minute still favor the stop. Short entries are
+    # never opened because AstroStrategyMA.should_short() returns False, but they still count
+    # as entry attempts.
+
+    def __init__(self, candles: np.ndarray, astro_asset: pd.DataFrame, capital: float = 10_000,
+                 fee_rate: float = 0.001, warmup_candles_num: int = None, minute_candles: np.ndarray = None,
+                 versions: SignalVersions = None):
+        if warmup_candles_num is None:
+            warmup_candles_num = jh.get_config('env.data.warmup_candles_num', 210)
+
+        self.candles = candles
+        self.capital = capital
+        self.fee_rate = fee_rate
+        self.warmup_candles_num = warmup_candles_num
+
+        self.day = (candles[:, 0] // DAY_MS).astype(np.int64)
+        self.hour = ((candles[:, 0] // HOUR_MS) % 24).astype(np.int64)
+
+        self.signals = AstroSignals.from_frame(astro_asset)
+        # Given the signal versions, each bar reads the vintage published by its time like signals_at().
+        self.versions = versions
+        if versions is not None:
+            self.vintage = np.searchsorted(versions.published, candles[:, 0], side='right') - 1
+        self.intrabar = IntrabarCandles(candles, minute_candles) if minute_candles is not None else None
+
+        self.atr = WindowedIndicator(ta.atr, candles, warmup_candles_num)
+        self.adx = WindowedIndicator(ta.adx, candles, warmup_candles_num)
+        self.sma = {}
+
+    def sma_series(self, period: int) -> np.ndarray:
+        if period not in self.sma:
+            closes = self.candles[:, 2]
+            cumsum = np.concatenate(([0.0], np.cumsum(closes)))
+            series = np.full(len(closes), np.nan)
+            series[period - 1:] = (cumsum[period:] - cumsum[:-period]) / period
+            self.sma[period] = series
+        return self.sma[period]
+
+    def astro_decision(self, i: int, shift_hour: np.ndarray, trend_period: np.ndarray, min_margin: np.ndarray):
+        # Same windows as astro_signal_period_decision() over astro_asset.loc[candle_date:].
+        signals = self.signals if self.versions is None else self.versions.vintages[self.vintage[i]]
+        rows = len(signals.days)
+        start = np.minimum(signals.row(int(self.day[i])) + (self.hour[i] >= shift_hour), rows)
+        end = np.minimum(start + trend_period, rows)
+        count = end - start
+        strong = signals.window_min_margin[trend_period - 1, start] >= min_margin
+        is_buy = strong & ((signals.buy_cumsum[end] - signals.buy_cumsum[start]) == count)
+        is_sell = strong & ~is_buy & ((signals.sell_cumsum[end] - signals.sell_cumsum[start]) == count)
+        return is_buy, is_sell
+
+    def run(self, candidates: list, start: int = None, keep_log: bool = False) -> BatchResult:
+        if start is None:
+            start = self.warmup_candles_num
+        start = max(start, 1)
+        if self.versions is not None and len(self.candles) > start and self.vintage[start] < 0:
+            raise ValueError(f"No astro signals vintage was published by {jh.timestamp_to_time(self.candles[start, 0])}, "
+                             f"the backtest would read forecasts made after the candles.")
+
+        def column(name, dtype=float):
+            return np.array([hp[name] for hp in candidates], dtype=dtype)
+
+        n = len(candidates)
+        slow_period = column('slow_ma_period', int)
+        fast_period = (slow_period / column('fast_ma_devider')).astype(int)
+        entry_atr_period = column('entry_atr_period', int)
+        stop_atr_period = column('stop_atr_period', int)
+        take_profit_atr_period = column('take_profit_atr_period', int)
+        entry_stop_atr_rate = column('entry_stop_atr_rate')
+        stop_loss_atr_rate = column('stop_loss_atr_rate')
+        trailing_stop_atr_rate = column('trailing_stop_atr_rate')
+        take_profit_atr_rate = column('take_profit_atr_rate')
+        max_day_attempts = column('max_day_attempts', int)
+        shift_hour = column('astro_signal_shift_hour', int)
+        trend_period = column('astro_signal_trend_period', int)
+        min_margin = np.array([hp.get('astro_signal_min_margin', 0) for hp in candidates], dtype=int)
+        astro_enabled = column('enable_astro_signal', int) == 1
+
+        periods = np.unique(np.concatenate((slow_period, fast_period)))
+        sma_rows = np.stack([self.sma_series(int(period)) for period in periods])
+        slow_row = np.searchsorted(periods, slow_period)
+        fast_row = np.searchsorted(periods, fast_period)
+
+        balance = np.full(n, float(self.capital))
+        trades = np.zeros(n, dtype=np.int64)
+        wins = np.zeros(n, dtype=np.int64)
+        log = []
+
+        pending = np.zeros(n, dtype=bool)
+        is_long = np.zeros(n, dtype=bool)
+        fresh = np.zeros(n, dtype=bool)
+        order_entry = np.zeros(n)
+        order_stop = np.zeros(n)
+        order_take_profit = np.zeros(n)
+        order_qty = np.zeros(n)
+        entry_price = np.zeros(n)
+        entry_index = np.zeros(n, dtype=np.int64)
+        qty = np.zeros(n)
+        stop = np.zeros(n)
+        take_profit = np.zeros(n)
+        attempts = np.zeros(n, dtype=np.int64)
+        attempts_day = -1
+
+        def close_positions(mask, i, exit_price):
+            if not mask.any():
+                return
+            pnl = (exit_price - entry_price) * qty
+            pnl -= self.fee_rate * (entry_price + exit_price) * qty
+            balance[mask] += pnl[mask]
+            trades[mask] += 1
+            wins[mask & (pnl > 0)] += 1
+            if keep_log:
+                for c in np.flatnonzero(mask):
+                    log.append((c, int(entry_index[c]), i, entry_price[c], exit_price[c], qty[c], pnl[c]))
+            is_long[mask] = False
+
+        def fill_orders(filled, i, price):
+            is_long[filled] = True
+            entry_price[filled] = price
+            entry_index[filled] = i
+            qty[filled] = order_qty[filled]
+            stop[filled] = order_stop[filled]
+            take_profit[filled] = order_take_profit[filled]
+
+        intrabar = self.intrabar
+        for i in range(start, len(self.candles)):
+            _, open_price, close, high, low = self.candles[i, :5]
+
+            if intrabar is None:
+                # Stop-loss / take-profit of positions opened before this bar.
+                holding = is_long & ~fresh
+                stopped = holding & (low <= stop)
+                close_positions(stopped, i, np.minimum(stop, open_price))
+                profited = holding & ~stopped & (high >= take_profit)
+                close_positions(profited, i, np.maximum(take_profit, open_price))
+                fresh[:] = False
+
+                # Stop-entry orders placed at the previous close.
+                filled = pending & (high >= order_entry)
+                if filled.any():
+                    fill_orders(filled, i, np.maximum(order_entry, open_price)[filled])
+                    fresh[filled] = True
+                pending[:] = False
+            else:
+                # Stop-entry orders placed at the previous close, at the minute they trigger. The exits
+                # of a new position are watched from the next minute, the ones held before from the first.
+                watch_from = np.zeros(n, dtype=np.int64)
+                filled = pending & (high >= order_entry)
+                if filled.any():
+                    minutes = intrabar.first_touch(i, order_entry[filled], above=True)
+                    fill_orders(filled, i, intrabar.fill_price(i, order_entry[filled], minutes, above=True))
+                    watch_from[filled] = minutes + 1
+                pending[:] = False
+
+                exiting = np.flatnonzero(is_long & ((low <= stop) | (high >= take_profit)))
+                if len(exiting):
+                    after = watch_from[exiting]
+                    stop_minute = intrabar.first_touch(i, stop[exiting], above=False, after=after)
+                    take_profit_minute = intrabar.first_touch(i, take_profit[exiting], above=True, after=after)
+                    stopped = (stop_minute < intrabar.minutes) & (stop_minute <= take_profit_minute)
+                    profited = (take_profit_minute < intrabar.minutes) & (take_profit_minute < stop_minute)
+
+                    exit_price = np.zeros(n)
+                    exit_price[exiting[stopped]] = intrabar.fill_price(
+                        i, stop[exiting[stopped]], stop_minute[stopped], above=False)
+                    exit_price[exiting[profited]] = intrabar.fill_price(
+                        i, take_profit[exiting[profited]], take_profit_minute[profited], above=True)
+                    closed = np.zeros(n, dtype=bool)
+                    closed[exiting[stopped | profited]] = True
+                    close_positions(closed, i, exit_price)
+
+            fast = sma_rows[fast_row, i]
+            slow = sma_rows[slow_row, i]
+            prev_fast = sma_rows[fast_row, i - 1]
+            prev_slow = sma_rows[slow_row, i - 1]
+            bull_cross = (fast > slow) & (prev_fast <= prev_slow)
+            bear_cross = (fast < slow) & (prev_fast >= prev_slow)
+
+            # update_position(): exit on reversal, then trailing stop.
+            reversal = is_long & bear_cross
+            close_positions(reversal, i, np.full(n, close))
+
+            trailing = is_long & (close > entry_price) & (close > fast)
+            if trailing.any():
+                trailing[trailing] = self.adx.gather(i, np.full(trailing.sum(), 14)) > 25
+            if trailing.any():
+                trailing_stop = np.full(n, np.nan)
+                trailing_stop[trailing] = close - self.atr.gather(i, stop_atr_period[trailing]) * \
+                                          trailing_stop_atr_rate[trailing]
+                fallback = trailing & ((trailing_stop >= order_entry) | (trailing_stop < 0))
+                trailing_stop[fallback] = close * 0.95
+                moved = trailing & (trailing_stop < close)
+                stop[moved] = trailing_stop[moved]
+
+            # should_short() / should_long() with the shared daily attempts counter.
+            if self.day[i] != attempts_day:
+                attempts_day = self.day[i]
+                attempts[:] = 0
+
+            flat = ~is_long
+            if not flat.any():
+                continue
+
+            is_buy, is_sell = self.astro_decision(i, shift_hour, trend_period, min_margin)
+            bull_astro = ~astro_enabled | is_buy
+            bear_astro = ~astro_enabled | is_sell
+
+            short_attempt = flat & bear_astro & bear_cross & (attempts < max_day_attempts)
+            attempts[short_attempt] += 1
+            go_long = flat & bull_astro & bull_cross & (attempts < max_day_attempts)
+            attempts[go_long] += 1
+
+            if go_long.any():
+                entry = close + self.atr.gather(i, entry_atr_period[go_long]) * entry_stop_atr_rate[go_long]
+                long_stop = close - self.atr.gather(i, stop_atr_period[go_long]) * stop_loss_atr_rate[go_long]
+                fallback = (long_stop >= entry) | (long_stop < 0)
+                long_stop[fallback] = entry[fallback] * 0.95
+                long_take_profit = entry + self.atr.gather(i, take_profit_atr_period[go_long]) * \
+                                   take_profit_atr_rate[go_long]
+
+                # position_size(): risk 30% of the margin, never more than 30% of it in size.
+                margin = balance[go_long]
+                fee_factor = 1 - self.fee_rate * 3
+                risk_size = np.minimum(0.30 * margin / np.abs(entry - long_stop) * entry, margin) * fee_factor
+                risk_qty = floor_with_precision(risk_size * fee_factor / entry, 8)
+                max_qty = floor_with_precision(0.30 * margin * fee_factor / entry, 3)
+
+                pending[go_long] = True
+                order_entry[go_long] = entry
+                order_stop[go_long] = long_stop
+                order_take_profit[go_long] = long_take_profit
+                order_qty[go_long] = np.minimum(risk_qty, max_qty)
+
+        # Close what is still open at the last price like jesse does at the end of a backtest.
+        close_positions(is_long.copy(), len(self.candles) - 1, np.full(n, self.candles[-1, 2]))
+
+        return BatchResult(balance, trades, wins, log)
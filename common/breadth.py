@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import numpy as np
+
+from common.astro_signals import AstroSignals
+
+STRATEGIES_PATH = Path(__file__).parent.parent / 'strategies'
+SIGNALS_PATH = STRATEGIES_PATH / 'AstroStrategyMA'
+
+
+class SignalBreadth:
+    # Astro signal actions of all the assets as a (days, assets) int8 matrix (1 buy, -1 sell,
+    # 0 no signal) and the daily breadth: the share of the assets with a signal that are bullish.
+    # Built once per process and read only, so every route shares the same arrays.
+
+    def __init__(self, first_day: int, assets: list, actions: np.ndarray):
+        self.first_day = first_day
+        self.assets = assets
+        self.actions = actions
+        self.bullish = (actions == 1).sum(axis=1).astype(np.int8)
+        self.bearish = (actions == -1).sum(axis=1).astype(np.int8)
+        available = self.bullish + self.bearish
+        self.breadth = np.divide(self.bullish, available, out=np.full(len(actions), np.nan, dtype=np.float32),
+                                 where=available > 0)
+        for array in (self.actions, self.bullish, self.bearish, self.breadth):
+            array.flags.writeable = False
+
+    @classmethod
+    def build(cls, path: Path = SIGNALS_PATH):
+        files = sorted(path.glob('ml-*-USD-daily-index.csv'))
+        if not files:
+            raise ValueError(f"No astro signals found in {path}")
+
+        assets = [file.name.split('-')[1] for file in files]
+        signals = [AstroSignals.read_csv(file) for file in files]
+        first_day = min(int(s.days[0]) for s in signals)
+        last_day = max(int(s.days[-1]) for s in signals)
+
+        actions = np.zeros((last_day - first_day + 1, len(assets)), dtype=np.int8)
+        for column, asset_signals in enumerate(signals):
+            actions[asset_signals.days - first_day, column] = asset_signals.action
+        return cls(first_day, assets, actions)
+
+    def row(self, day: int):
+        offset = day - self.first_day
+        if offset < 0 or offset >= len(self.actions):
+            return None
+        return offset
+
+    def breadth_at(self, day: int) -> float:
+        # Share of bullish assets of the day number, NaN outside of the signals.
+        row = self.row(day)
+        return float('nan') if row is None else float(self.breadth[row])
+
+    def action(self, day: int, asset: str) -> int:
+        row = self.row(day)
+        return 0 if row is None else int(self.actions[row, self.assets.index(asset)])
+
+
+breadth = None
+
+
+def signal_breadth() -> SignalBreadth:
+    global breadth
+    if breadth is None:
+        breadth = SignalBreadth.build()
+    return breadth
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+from common.alignment import TimeframeAlignment
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class CandleTimeMixin:
+    # Candle time helpers for the strategies. The timestamps are decoded once for the whole
+    # route by the alignment index, so the per candle calls are plain array lookups.
+
+    @property
+    def alignment(self) -> TimeframeAlignment:
+        if 'alignment' not in self.vars:
+            self.vars['alignment'] = TimeframeAlignment(self.candles[0, 0], self.timeframe)
+        return self.vars['alignment']
+
+    @property
+    def candle_position(self) -> int:
+        # From the timestamp so it keeps working if old candles are dropped in live sessions.
+        return self.alignment.position_of(self.candles[-1, 0])
+
+    def current_candle_day(self) -> int:
+        return self.alignment.day(self.candle_position)
+
+    def current_candle_hour(self) -> int:
+        return self.alignment.hour(self.candle_position)
+
+    def current_candle_date_key(self) -> str:
+        return self.alignment.date_key(self.candle_position)
+
+    def current_candle_date(self) -> datetime:
+        return EPOCH + timedelta(days=self.current_candle_day())
@@ -0,0 +1,105 @@
+from pathlib import Path
+
+import numpy as np
+
+DAY_MS = 86_400_000
+EPHEMERIS_PATH = Path(__file__).parent.parent / 'storage' / 'ephemeris'
+
+# Observer locations for the local solar time as (latitude, longitude) in degrees.
+OBSERVERS = {
+    # Bitcoin birthplace: https://astralharmony.com/blog/astrology-bitcoin-series-part-two/
+    'Van Nuys': (34.1867, -118.4490),
+    # Calendar origin of the BaZi pillars.
+    'Beijing': (39.9042, 116.4074),
+}
+
+
+class SolarTable:
+    # Per day sun right ascension (hours), equation of time (minutes) and local solar noon
+    # (UTC minutes) of one observer, looked up by day number instead of running ephem per candle.
+
+    def __init__(self, longitude: float, first_day: int, sun_ra: np.ndarray, equation_of_time: np.ndarray,
+                 solar_noon: np.ndarray):
+        self.longitude = longitude
+        self.first_day = first_day
+        self.sun_ra = sun_ra
+        self.equation_of_time = equation_of_time
+        self.solar_noon = solar_noon
+
+    @classmethod
+    def build(cls, name: str, first_day: int, last_day: int):
+        # Imported here, ephem is only needed when the table isn't in storage yet.
+        import ephem
+
+        latitude, longitude = OBSERVERS[name]
+        observer = ephem.Observer()
+        observer.lat = str(latitude)
+        observer.lon = str(longitude)
+        sun = ephem.Sun()
+        epoch = ephem.Date('1970/1/1')
+
+        days = last_day - first_day + 1
+        sun_ra = np.empty(days, dtype=np.float32)
+        equation_of_time = np.empty(days, dtype=np.float32)
+        for i in range(days):
+            # Sampled at 12:00 UTC of each day.
+            observer.date = ephem.Date(epoch + first_day + i + 0.5)
+            sun.compute(observer)
+            sun_ra[i] = sun.ra * 12 / np.pi
+            # Apparent solar time is the sun hour angle + 12h, mean solar time is UTC + longitude.
+            apparent = (observer.sidereal_time() - sun.ra) * 12 / np.pi + 12
+            mean = 12 + longitude / 15
+            equation_of_time[i] = ((apparent - mean + 12) % 24 - 12) * 60
+
+        solar_noon = (720 - longitude * 4 - equation_of_time).astype(np.float32)
+        return cls(longitude, first_day, sun_ra, equation_of_time, solar_noon)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(float(data['longitude']), int(data['first_day']), data['sun_ra'], data['equation_of_time'],
+                       data['solar_noon'])
+
+    def save(self, path):
+        np.savez_compressed(path, longitude=self.longitude, first_day=self.first_day, sun_ra=self.sun_ra,
+                            equation_of_time=self.equation_of_time, solar_noon=self.solar_noon)
+
+    @property
+    def last_day(self) -> int:
+        return self.first_day + len(self.sun_ra) - 1
+
+    def solar_times(self, timestamps: np.ndarray) -> np.ndarray:
+        # Local apparent solar time of each timestamp as a timestamp (ms), so its day and hour read
+        # like the UTC ones. Days out of range use the edges.
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        rows = np.clip(timestamps // DAY_MS - self.first_day, 0, len(self.equation_of_time) - 1)
+        offsets = (self.longitude * 4 + self.equation_of_time[rows].astype(np.float64)) * 60_000
+        return timestamps + np.round(offsets).astype(np.int64)
+
+    def solar_hours(self, timestamps: np.ndarray) -> np.ndarray:
+        # Local apparent solar time in hours of each timestamp.
+        return (self.solar_times(timestamps) % DAY_MS) / 3_600_000
+
+    def solar_hour(self, timestamp: float) -> float:
+        return float(self.solar_hours([timestamp])[0])
+
+
+# Tables shared by all the routes of the process.
+tables = {}
+
+
+def solar_table(name: str, first_day: int, last_day: int) -> SolarTable:
+    key = (name, first_day, last_day)
+    if key in tables:
+        return tables[key]
+
+    path = EPHEMERIS_PATH / f"{name.replace(' ', '_')}-{first_day}-{last_day}.npz"
+    if path.exists():
+        table = SolarTable.load(path)
+    else:
+        table = SolarTable.build(name, first_day, last_day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table.save(path)
+
+    tables[key] = table
+    return table
@@ -0,0 +1,206 @@
+import atexit
+import gzip
+import json
+import queue
+import socket
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import jesse.helpers as jh
+
+EVENTS_PATH = Path(__file__).parent.parent / 'storage' / 'events'
+# Noisy categories of config.py['logging'] keep 1 in N events once the queue is PRESSURE full,
+# the order and position events are only dropped when it's completely full.
+SAMPLING = {'trading_candles': 10, 'balance_update': 5}
+PRESSURE = 0.5
+
+
+def json_default(value):
+    # numpy scalars, uuids and the like.
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class RotatingJsonlSink:
+    # gzip compressed JSONL files of up to max_bytes of events each, only the newest keep files stay.
+
+    def __init__(self, path: Path = EVENTS_PATH, max_bytes: int = 64 * 2 ** 20, keep: int = 20):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.file = None
+        self.size = 0
+
+    def rotate(self):
+        self.close()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.file = gzip.open(self.path / f'events-{time.time_ns()}.jsonl.gz', 'at', encoding='utf-8')
+        self.size = 0
+        for old in sorted(self.path.glob('events-*.jsonl.gz'))[:-self.keep]:
+            old.unlink()
+
+    def write(self, lines: list):
+        if self.file is None or self.size >= self.max_bytes:
+            self.rotate()
+        data = ''.join(lines)
+        self.file.write(data)
+        # A sync flush per batch, so a crash loses at most the batch being written.
+        self.file.flush()
+        self.size += len(data)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class CollectorSink:
+    # Sends every event as a UDP datagram to a local collector instead, e.g. `nc -klu 9999`.
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9999):
+        self.address = (host, port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def write(self, lines: list):
+        for line in lines:
+            self.socket.sendto(line.encode(), self.address)
+
+    def close(self):
+        self.socket.close()
+
+
+class EventLog:
+    # Structured events of the routes. log() only puts them in a bounded queue, a writer thread
+    # serializes and writes them in batches to the sink, so logging never blocks the order path.
+    # Under pressure the SAMPLING categories are sampled, and whatever doesn't fit or fails to
+    # be written is dropped and counted. The counts are written as 'event_log_dropped' events.
+
+    def __init__(self, sink=None, capacity: int = 10_000, batch_size: int = 500, categories: dict = None):
+        self.sink = sink or RotatingJsonlSink()
+        self.capacity = capacity
+        self.batch_size = batch_size
+        # config.py['logging'] switches, categories missing from it are logged.
+        self.categories = categories or {}
+        self.queue = queue.Queue(capacity)
+        self.seen = Counter()
+        self.sampled = Counter()
+        self.dropped = Counter()
+        self.reported = {}
+        # The counters are updated from the strategy threads and read by the writer.
+        self.counts_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.writer = threading.Thread(target=self.run, name='event-log', daemon=True)
+        self.writer.start()
+
+    def log(self, category: str, **fields) -> bool:
+        if not self.categories.get(category, True):
+            return False
+
+        rate = SAMPLING.get(category)
+        if rate and self.queue.qsize() >= PRESSURE * self.capacity:
+            with self.counts_lock:
+                self.seen[category] += 1
+                if self.seen[category] % rate:
+                    self.sampled[category] += 1
+                    return False
+
+        try:
+            self.queue.put_nowait((time.time(), category, fields))
+        except queue.Full:
+            with self.counts_lock:
+                self.dropped[category] += 1
+            return False
+        return True
+
+    def next_batch(self) -> list:
+        try:
+            batch = [self.queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while not (self.stopped.is_set() and self.queue.empty()):
+            batch = self.next_batch()
+            with self.counts_lock:
+                counts = {'sampled': dict(self.sampled), 'dropped': dict(self.dropped)}
+            if counts != self.reported and (counts['sampled'] or counts['dropped']):
+                batch.append((time.time(), 'event_log_dropped', counts))
+                self.reported = counts
+            if not batch:
+                continue
+
+            # Nothing may stop the writer, the queue would fill up and every event be dropped.
+            try:
+                lines = [json.dumps({'time': timestamp, 'category': category, **fields}, default=json_default) + '\n'
+                         for timestamp, category, fields in batch]
+                self.sink.write(lines)
+            except Exception:
+                with self.counts_lock:
+                    self.dropped['write_error'] += len(batch)
+
+    def close(self, timeout: float = 5):
+        # Writes what is still queued and closes the sink.
+        self.stopped.set()
+        self.writer.join(timeout)
+        # A writer still busy after the timeout keeps its sink, it dies with the process.
+        if not self.writer.is_alive():
+            self.sink.close()
+
+
+events = None
+
+
+def event_log() -> EventLog:
+    # One log for all the routes of the process.
+    global events
+    if events is None:
+        events = EventLog(categories=jh.get_config('env.logging', None))
+        atexit.register(events.close)
+    return events
+
+
+def order_fields(order) -> dict:
+    return {'order_id': order.id, 'side': order.side, 'type': order.type, 'qty': order.qty, 'price': order.price}
+
+
+class EventLogMixin:
+    # Live only: the order and position events of the route go to the shared event_log().
+
+    def log_event(self, category: str, **fields):
+        if jh.is_live():
+            event_log().log(category, route=f'{self.exchange}-{self.symbol}-{self.timeframe}', **fields)
+
+    def log_trading_candle(self):
+        timestamp, open, close, high, low, volume = self.candles[-1, :6]
+        self.log_event('trading_candles', timestamp=timestamp, open=open, close=close, high=high, low=low,
+                       volume=volume)
+
+    def _on_updated_position(self, order):
+        # jesse calls it for every executed order, before the position hooks.
+        self.log_event('order_execution', **order_fields(order))
+        super()._on_updated_position(order)
+
+    def on_open_position(self, order):
+        self.log_event('position_opened', **order_fields(order))
+
+    def on_close_position(self, order, closed_trade=None):
+        fields = order_fields(order)
+        if closed_trade is not None:
+            fields['pnl'] = closed_trade.pnl
+        self.log_event('position_closed', **fields)
+
+    def on_increased_position(self, order):
+        self.log_event('position_increased', **order_fields(order))
+
+    def on_reduced_position(self, order):
+        self.log_event('position_reduced', **order_fields(order))
+
+    def on_cancel(self):
+        self.log_event('order_cancellation')
@@ -0,0 +1,158 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from common.astro_signals import AstroSignals
+from common.ephemeris import solar_table
+from common.flying_stars import FlyingStars
+from common.hour_pillars import ELEMENT_SCORES, ELEMENTS, HourPillars
+from common.sunspots import sunspot_regime
+from common.trigrams import classify_trigrams
+
+DAY_MS = 86_400_000
+STRATEGIES_PATH = Path(__file__).parent.parent / 'strategies'
+
+
+def candle_lines(candles: np.ndarray) -> np.ndarray:
+    # Yin (0) / yang (1) line of each candle like generate_symbol_from_color() of IChingAstro and Geomancy.
+    open = candles[:, 1]
+    close = candles[:, 2]
+    high = candles[:, 3]
+    low = candles[:, 4]
+    yin = (close < open) | ((close == open) & (low < high))
+    return (~yin).astype(np.int8)
+
+
+def pack_lines(lines: np.ndarray, count: int) -> np.ndarray:
+    # Code of the symbol made of the last N lines of each candle, oldest line first (highest bit).
+    # -1 until there are enough candles.
+    codes = np.full(len(lines), -1, dtype=np.int16)
+    if len(lines) >= count:
+        weights = 1 << np.arange(count - 1, -1, -1)
+        codes[count - 1:] = sliding_window_view(lines, count) @ weights
+    return codes
+
+
+def iching_features(candles: np.ndarray) -> dict:
+    # Symbols of IChingAstro with symbol_method 0.
+    lines = candle_lines(candles)
+    return {
+        'iching_hexagram': pack_lines(lines, 6),
+        'iching_trigram': pack_lines(lines, 3),
+        'iching_bigram': pack_lines(lines, 2),
+    }
+
+
+def geomancy_features(candles: np.ndarray) -> dict:
+    # Shield chart of Geomancy.generate_all_symbols() with symbol_method 0 for every candle.
+    size = len(candles)
+    features = {name: np.full(size, -1, dtype=np.int8) for name in
+                ('geomancy_judge', 'geomancy_reconciler', 'geomancy_second_daughter', 'geomancy_part_of_fortune',
+                 'geomancy_fortune_figure')}
+    if size < 16:
+        return features
+
+    # (candles, mother, line) from the last 16 candles, the daughters are the transposed mothers.
+    mothers = sliding_window_view(candle_lines(candles), 16).reshape(-1, 4, 4)
+    daughters = mothers.transpose(0, 2, 1)
+    nieces = np.stack([mothers[:, 0] ^ mothers[:, 1], mothers[:, 2] ^ mothers[:, 3],
+                       daughters[:, 0] ^ daughters[:, 1], daughters[:, 2] ^ daughters[:, 3]], axis=1)
+    witness_1 = nieces[:, 0] ^ nieces[:, 1]
+    witness_2 = nieces[:, 2] ^ nieces[:, 3]
+    judge = witness_1 ^ witness_2
+    reconciler = judge ^ daughters[:, 1]
+
+    houses = np.concatenate((mothers, daughters, nieces), axis=1)
+    part_of_fortune = houses.sum(axis=(1, 2)) % 12
+    part_of_fortune[part_of_fortune == 0] = 12
+
+    # Figure codes pack the lines first line first: [1, 0, 0, 0] == 0b1000.
+    weights = np.array([8, 4, 2, 1], dtype=np.int8)
+    figures = houses @ weights
+    features['geomancy_judge'][15:] = judge @ weights
+    features['geomancy_reconciler'][15:] = reconciler @ weights
+    features['geomancy_second_daughter'][15:] = figures[:, 5]
+    features['geomancy_part_of_fortune'][15:] = part_of_fortune
+    features['geomancy_fortune_figure'][15:] = figures[np.arange(len(figures)), part_of_fortune - 1]
+    return features
+
+
+def astro_features(days: np.ndarray, signals: AstroSignals) -> dict:
+    # Buy / sell votes and action of the candle day, 0 when the day has no signal.
+    offsets = np.clip(days - signals.first_day, 0, len(signals.rows) - 1)
+    rows = np.minimum(signals.rows[offsets], len(signals.days) - 1)
+    found = signals.days[rows] == days
+    return {
+        'astro_buy': np.where(found, signals.buy[rows], 0).astype(np.int16),
+        'astro_sell': np.where(found, signals.sell[rows], 0).astype(np.int16),
+        'astro_action': np.where(found, signals.action[rows], 0).astype(np.int8),
+    }
+
+
+def read_bazi_calendar(path: Path = STRATEGIES_PATH / 'BaZi') -> dict:
+    calendar = pd.read_csv(path / 'bazi.csv')
+    calendar.index = pd.to_datetime(calendar[['Year', 'Month', 'Day']].set_axis(['year', 'month', 'day'], axis=1))
+    return {
+        'calendar': calendar,
+        'heavenly': pd.read_csv(path / 'bazi_heavenly_stems.csv', sep=',', index_col="S/N"),
+        'earthly': pd.read_csv(path / 'bazi_earthly_branches.csv', sep=';', index_col="S/N", encoding='latin-1'),
+        'day_hour_stem': pd.read_csv(path / 'bazi_relationship_day_hour_stem.CSV', sep=';', index_col=[0]),
+    }
+
+
+def bazi_features(timestamps: np.ndarray, days: np.ndarray, bazi: dict, observer: str = 'Van Nuys') -> dict:
+    # Elements of the year, month and day pillars, the day element score used by BaZi, the hour
+    # pillar score in the local solar time of the observer (BaZi.solar_time_observer) and the
+    # flying star centers. -1 (0 for the scores) outside of the calendar.
+    calendar = bazi['calendar']
+    first_day = int(calendar.index.values[0].astype('datetime64[D]').astype(np.int64))
+    rows = days - first_day
+    found = (rows >= 0) & (rows < len(calendar))
+    rows = np.where(found, rows, 0)
+
+    stem_elements = np.array([ELEMENTS.index(e) for e in bazi['heavenly'].loc[range(1, 11), 'Five Elements']])
+    branch_elements = np.array([ELEMENTS.index(e) for e in bazi['earthly'].loc[range(1, 13), 'Five Elements']])
+
+    features = {}
+    day_score = np.zeros(len(days), dtype=np.int8)
+    for pillar in ('Year', 'Month', 'Day'):
+        stem = stem_elements[calendar[f'HS of {pillar}'].values[rows] - 1]
+        branch = branch_elements[calendar[f'EB of {pillar}'].values[rows] - 1]
+        features[f'bazi_{pillar.lower()}_stem_element'] = np.where(found, stem, -1).astype(np.int8)
+        features[f'bazi_{pillar.lower()}_branch_element'] = np.where(found, branch, -1).astype(np.int8)
+        if pillar == 'Day':
+            day_score = np.where(found, ELEMENT_SCORES[stem] + ELEMENT_SCORES[branch], 0).astype(np.int8)
+    features['bazi_day_score'] = day_score
+
+    solar = solar_table(observer, first_day, first_day + len(calendar) - 1)
+    hour_pillars = HourPillars.build(calendar, bazi['day_hour_stem'], bazi['heavenly'], bazi['earthly'], solar)
+    features['bazi_hour_score'] = hour_pillars.scores(timestamps).astype(np.int8)
+
+    flying_stars = FlyingStars.build(calendar)
+    year_center = flying_stars.year_charts[flying_stars.day_year[rows], 1, 1]
+    month_center = flying_stars.month_charts[flying_stars.day_year[rows], flying_stars.day_month[rows], 1, 1]
+    features['flying_star_year'] = np.where(found, year_center, -1).astype(np.int8)
+    features['flying_star_month'] = np.where(found, month_center, -1).astype(np.int8)
+    return features
+
+
+def feature_matrix(candles: np.ndarray, symbol: str, sunspots: pd.DataFrame = None) -> pd.DataFrame:
+    # All the esoteric features of the strategies for each candle, indexed by the candle timestamp.
+    # The sunspot regime needs the frame of common.sunspots.fetch_sunspots().
+    timestamps = candles[:, 0].astype(np.int64)
+    days = timestamps // DAY_MS
+
+    base_asset = symbol.split('-')[0]
+    signals = AstroSignals.read_csv(STRATEGIES_PATH / 'AstroStrategyMA' / f'ml-{base_asset}-USD-daily-index.csv')
+
+    features = {'candle_trigram': classify_trigrams(candles)}
+    features.update(astro_features(days, signals))
+    features.update(iching_features(candles))
+    features.update(geomancy_features(candles))
+    features.update(bazi_features(timestamps, days, read_bazi_calendar()))
+    if sunspots is not None:
+        features['sunspot_regime'] = sunspot_regime(days, sunspots)
+
+    return pd.DataFrame(features, index=pd.Index(timestamps, name='timestamp'))
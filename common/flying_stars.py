@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# Step of the flight path in each palace, the chart is laid out as
+# [[Southeast, South, Southwest], [East, Center, West], [Northeast, North, Northwest]] and the stars
+# fly Center -> Northwest -> West -> Northeast -> South -> North -> Southwest -> East -> Southeast.
+FLIGHT_PATH = np.array([[8, 4, 6], [7, 0, 2], [3, 5, 1]], dtype=np.int8)
+
+# Monthly center star of the Yin month (first month) per year branch: 8 in the Zi, Wu, Mao and
+# You years, 5 in the Chen, Xu, Chou and Wei years and 2 in the Yin, Shen, Si and Hai years.
+FIRST_MONTH_STAR = np.array([8, 5, 2, 8, 5, 2, 8, 5, 2, 8, 5, 2], dtype=np.int8)
+
+
+def flying_star_chart(center) -> np.ndarray:
+    # 3x3 chart(s) of the given center star(s), the other stars follow the flight path.
+    center = np.asarray(center, dtype=np.int8)[..., None, None]
+    return ((center - 1 + FLIGHT_PATH) % 9 + 1).astype(np.int8)
+
+
+def annual_star(years) -> np.ndarray:
+    # Center star of the (Li Chun based) years, it goes down by one every year: 2020 = 7, 2024 = 3.
+    return ((10 - np.asarray(years) % 9) % 9 + 1).astype(np.int8)
+
+
+class FlyingStars:
+    # Annual and monthly flying star charts of the BaZi calendar range. A chart is two array
+    # indexes away from a day number, the years follow the year pillars of bazi.csv.
+
+    def __init__(self, first_day: int, first_year: int, day_year: np.ndarray, day_month: np.ndarray,
+                 year_charts: np.ndarray, month_charts: np.ndarray):
+        self.first_day = first_day
+        self.first_year = first_year
+        self.day_year = day_year
+        self.day_month = day_month
+        # (years, 3, 3) and (years, 12, 3, 3), the months start with the Yin month.
+        self.year_charts = year_charts
+        self.month_charts = month_charts
+
+    @classmethod
+    def build(cls, calendar: pd.DataFrame):
+        days = calendar.index.values.astype('datetime64[D]').astype(np.int64)
+        if not len(days) or np.any(np.diff(days) != 1):
+            raise ValueError("The BaZi calendar must have exactly one row per day.")
+
+        # Gregorian year of the year pillar, 1984 is Jia Zi (index 0 of the sexagenary cycle).
+        stem = calendar['HS of Year'].values.astype(np.int64)
+        branch = calendar['EB of Year'].values.astype(np.int64)
+        cycle = (6 * (stem - 1) - 5 * (branch - 1)) % 60
+        gregorian = calendar.index.year.values.astype(np.int64)
+        years = gregorian - (gregorian - 1984 - cycle) % 60
+
+        first_year = int(years.min())
+        year_numbers = np.arange(first_year, years.max() + 1)
+        year_charts = flying_star_chart(annual_star(year_numbers))
+
+        # The monthly star goes down by one every month starting from the Yin month.
+        year_branch = (year_numbers - 1984) % 12
+        month_offsets = np.arange(12)
+        month_centers = (FIRST_MONTH_STAR[year_branch][:, None] - 1 - month_offsets[None, :]) % 9 + 1
+        month_charts = flying_star_chart(month_centers)
+
+        day_month = ((calendar['EB of Month'].values.astype(np.int64) - 3) % 12).astype(np.int8)
+        return cls(int(days[0]), first_year, (years - first_year).astype(np.int16), day_month, year_charts,
+                   month_charts)
+
+    def row(self, day: int):
+        offset = day - self.first_day
+        if offset < 0 or offset >= len(self.day_year):
+            return None
+        return offset
+
+    def year_chart(self, day: int):
+        # Annual chart of the day number, None outside of the calendar.
+        row = self.row(day)
+        if row is None:
+            return None
+        return self.year_charts[self.day_year[row]]
+
+    def month_chart(self, day: int):
+        # Monthly chart of the day number, None outside of the calendar.
+        row = self.row(day)
+        if row is None:
+            return None
+        return self.month_charts[self.day_year[row], self.day_month[row]]
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+HOUR_MS = 3_600_000
+
+ELEMENTS = ('Wood', 'Fire', 'Earth', 'Metal', 'Water')
+# Same weights as BaZi.bazi_signal_period_decision(): BTC is metal, so metal, earth and water are good.
+ELEMENT_SCORES = np.array([-1, -1, 1, 1, 1], dtype=np.int8)
+
+
+class HourPillars:
+    # Hour pillars (stem, branch and their elements) expanded from the day pillars of bazi.csv.
+    # The relationship tables are only used to build the arrays, so the strategy looks up the
+    # 2-hour pillar of a candle with a single index. Entries are hourly and pairs share a pillar.
+    #
+    # The hours are local apparent solar time of the SolarTable observer (UTC without one). The Zi
+    # hour (23:00 - 01:00) opens the next day, so the arrays are shifted by one hour: entry 0 is
+    # 23:00 of the day before the first calendar day.
+
+    def __init__(self, first_day: int, stem: np.ndarray, branch: np.ndarray, stem_element: np.ndarray,
+                 branch_element: np.ndarray, solar_table=None):
+        self.first_day = first_day
+        self.solar_table = solar_table
+        self.first_hour = first_day * 24
+        self.stem = stem
+        self.branch = branch
+        self.stem_element = stem_element
+        self.branch_element = branch_element
+        self.score = ELEMENT_SCORES[stem_element] + ELEMENT_SCORES[branch_element]
+
+    @classmethod
+    def build(cls, calendar: pd.DataFrame, day_hour_stem: pd.DataFrame, heavenly: pd.DataFrame,
+              earthly: pd.DataFrame, solar_table=None):
+        days = calendar.index.values.astype('datetime64[D]').astype(np.int64)
+        if not len(days) or np.any(np.diff(days) != 1):
+            raise ValueError("The BaZi calendar must have exactly one row per day.")
+        # Rows are the day stems 1 - 10, columns the hour branches 1 - 12.
+        if day_hour_stem.shape != (10, 12):
+            raise ValueError(f"The day / hour stem table must be 10x12, got {day_hour_stem.shape}.")
+
+        stem_table = day_hour_stem.values.astype(np.int8)
+        slot_branch = np.repeat(np.arange(1, 13, dtype=np.int8), 2)
+        day_stem = calendar['HS of Day'].values.astype(np.int64)
+
+        stem = stem_table[day_stem[:, None] - 1, slot_branch[None, :] - 1].ravel()
+        branch = np.tile(slot_branch, len(days))
+
+        stem_elements = np.array([ELEMENTS.index(heavenly.loc[i, 'Five Elements']) for i in range(1, 11)],
+                                 dtype=np.int8)
+        branch_elements = np.array([ELEMENTS.index(earthly.loc[i, 'Five Elements']) for i in range(1, 13)],
+                                   dtype=np.int8)
+        return cls(int(days[0]), stem, branch, stem_elements[stem - 1], branch_elements[branch - 1], solar_table)
+
+    def positions(self, timestamps) -> np.ndarray:
+        # Entry of each timestamp, -1 outside of the calendar.
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if self.solar_table is not None:
+            timestamps = self.solar_table.solar_times(timestamps)
+        positions = timestamps // HOUR_MS + 1 - self.first_hour
+        return np.where((positions >= 0) & (positions < len(self.stem)), positions, -1)
+
+    def position(self, timestamp: float) -> int:
+        return int(self.positions([timestamp])[0])
+
+    def scores(self, timestamps) -> np.ndarray:
+        # Element score of the hour pillars, 0 (neutral) outside of the calendar.
+        positions = self.positions(timestamps)
+        return np.where(positions >= 0, self.score[positions], 0)
+
+    def pillar(self, timestamp: float):
+        # (stem, branch) of the hour pillar, None outside of the calendar.
+        position = self.position(timestamp)
+        if position < 0:
+            return None
+        return int(self.stem[position]), int(self.branch[position])
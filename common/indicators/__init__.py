@@ -0,0 +1,5 @@
+from .adx import IncrementalADX
+from .donchian import IncrementalDonchian
+from .ift_rsi import IncrementalIFTRSI
+from .vwmacd import IncrementalVWMACD
+from .window import CandleWindow
@@ -0,0 +1,50 @@
+from collections import deque, namedtuple
+
+import numpy as np
+
+DonchianChannel = namedtuple('DonchianChannel', ['upperband', 'middleband', 'lowerband'])
+
+
+class IncrementalDonchian:
+    # Rolling highest high / lowest low with monotonic deques, O(1) amortized per candle
+    # instead of ta.donchian() over the whole history.
+
+    def __init__(self, period: int = 20):
+        self.period = period
+        self.count = 0
+        self.highs = deque()
+        self.lows = deque()
+        self.timestamp = None
+        self.value = DonchianChannel(np.nan, np.nan, np.nan)
+
+    def update(self, candles: np.ndarray) -> DonchianChannel:
+        # Catch up with every candle newer than the last one seen.
+        start = 0 if self.timestamp is None else np.searchsorted(candles[:, 0], self.timestamp, side='right')
+        for candle in candles[start:]:
+            self.add(candle[3], candle[4])
+        if len(candles):
+            self.timestamp = candles[-1, 0]
+        return self.value
+
+    def add(self, high: float, low: float):
+        position = self.count
+        self.count += 1
+
+        # Keep decreasing highs and increasing lows, the front is the extreme of the window.
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((position, high))
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((position, low))
+
+        oldest = position - self.period + 1
+        if self.highs[0][0] < oldest:
+            self.highs.popleft()
+        if self.lows[0][0] < oldest:
+            self.lows.popleft()
+
+        if self.count >= self.period:
+            upper = self.highs[0][1]
+            lower = self.lows[0][1]
+            self.value = DonchianChannel(upper, (upper + lower) / 2, lower)
@@ -0,0 +1,68 @@
+from collections import deque
+
+import numpy as np
+
+
+class IncrementalIFTRSI:
+    # Inverse Fisher Transform on RSI (ta.ift_rsi) kept up to date candle by candle. The Wilder
+    # averages of the RSI and the WMA window are the only state, and only the last two values
+    # are kept since that's all the trend start checks read.
+
+    def __init__(self, rsi_period: int = 5, wma_period: int = 9):
+        self.rsi_period = rsi_period
+        self.wma_period = wma_period
+        self.timestamp = None
+        self.prev_close = None
+        self.changes = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.window = deque(maxlen=wma_period)
+        self.weights_sum = wma_period * (wma_period + 1) / 2
+        self.values = np.full(2, np.nan)
+
+    def update(self, candles: np.ndarray) -> np.ndarray:
+        # Catch up with every candle newer than the last one seen.
+        start = 0 if self.timestamp is None else np.searchsorted(candles[:, 0], self.timestamp, side='right')
+        for close in candles[start:, 2]:
+            self.add(close)
+        if len(candles):
+            self.timestamp = candles[-1, 0]
+        return self.values
+
+    def add(self, close: float):
+        if self.prev_close is None:
+            self.prev_close = close
+            self.push(np.nan)
+            return
+
+        change = close - self.prev_close
+        self.prev_close = close
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        self.changes += 1
+        period = self.rsi_period
+
+        # Simple average of the first period changes, Wilder smoothing afterwards.
+        if self.changes <= period:
+            self.avg_gain += gain / period
+            self.avg_loss += loss / period
+            if self.changes < period:
+                self.push(np.nan)
+                return
+        else:
+            self.avg_gain = (self.avg_gain * (period - 1) + gain) / period
+            self.avg_loss = (self.avg_loss * (period - 1) + loss) / period
+
+        total = self.avg_gain + self.avg_loss
+        rsi = 100 * self.avg_gain / total if total != 0 else 0.0
+        self.window.append(0.1 * (rsi - 50))
+
+        if len(self.window) < self.wma_period:
+            self.push(np.nan)
+            return
+
+        wma = sum(weight * value for weight, value in enumerate(self.window, 1)) / self.weights_sum
+        self.push(((2 * wma) ** 2 - 1) / ((2 * wma) ** 2 + 1))
+
+    def push(self, value: float):
+        self.values = np.array((self.values[1], value))
@@ -0,0 +1,63 @@
+from collections import deque, namedtuple
+
+import numpy as np
+
+VWMACD = namedtuple('VWMACD', ['macd', 'signal', 'hist'])
+
+
+class RollingVWMA:
+    # Volume weighted moving average from running sums of the last period values.
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque()
+        self.price_volume = 0.0
+        self.volume = 0.0
+        self.updates = 0
+
+    def add(self, price: float, volume: float = 1.0) -> float:
+        self.window.append((price, volume))
+        self.price_volume += price * volume
+        self.volume += volume
+        if len(self.window) > self.period:
+            old_price, old_volume = self.window.popleft()
+            self.price_volume -= old_price * old_volume
+            self.volume -= old_volume
+
+        # Resum now and then so the running sums don't drift.
+        self.updates += 1
+        if self.updates % 10_000 == 0:
+            self.price_volume = sum(p * v for p, v in self.window)
+            self.volume = sum(v for _, v in self.window)
+
+        if len(self.window) < self.period or self.volume == 0:
+            return np.nan
+        return self.price_volume / self.volume
+
+
+class IncrementalVWMACD:
+    # ta.vwmacd kept up to date candle by candle: fast and slow VWMAs of the close and a
+    # moving average of their difference as the signal line.
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast = RollingVWMA(fast_period)
+        self.slow = RollingVWMA(slow_period)
+        self.signal = RollingVWMA(signal_period)
+        self.timestamp = None
+        self.value = VWMACD(np.nan, np.nan, np.nan)
+
+    def update(self, candles: np.ndarray) -> VWMACD:
+        # Catch up with every candle newer than the last one seen.
+        start = 0 if self.timestamp is None else np.searchsorted(candles[:, 0], self.timestamp, side='right')
+        for candle in candles[start:]:
+            self.add(candle[2], candle[5])
+        if len(candles):
+            self.timestamp = candles[-1, 0]
+        return self.value
+
+    def add(self, close: float, volume: float):
+        macd = self.fast.add(close, volume) - self.slow.add(close, volume)
+        if np.isnan(macd):
+            return
+        signal = self.signal.add(macd)
+        self.value = VWMACD(macd, signal, macd - signal)
@@ -0,0 +1,20 @@
+import numpy as np
+
+
+class CandleWindow:
+    # The last size candles, the whole input of the windowed jesse indicators: ta.sma() over
+    # candles[-240:] and the non sequential ones like ta.atr() that only see the last
+    # warmup_candles_num candles. Kept between candles, their values don't need the older candles.
+
+    def __init__(self, size: int):
+        self.size = size
+        self.candles = np.empty((0, 6))
+
+    def update(self, candles: np.ndarray) -> np.ndarray:
+        # Append every candle newer than the last one kept.
+        if len(self.candles):
+            if not len(candles) or candles[-1, 0] <= self.candles[-1, 0]:
+                return self.candles
+            candles = candles[np.searchsorted(candles[:, 0], self.candles[-1, 0], side='right'):]
+        self.candles = np.concatenate((self.candles, candles))[-self.size:]
+        return self.candles
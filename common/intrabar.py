@@ -0,0 +1,49 @@
+import numpy as np
+
+MINUTE_MS = 60_000
+
+
+class IntrabarCandles:
+    # The 1m candles of every bar as (bars, minutes) arrays, to tell which of the stop-entry,
+    # stop-loss and take-profit prices inside the same bar was reached first.
+
+    def __init__(self, candles: np.ndarray, minute_candles: np.ndarray):
+        if len(candles) < 2:
+            raise ValueError("At least two candles are needed to know their timeframe.")
+
+        self.minutes = int((candles[1, 0] - candles[0, 0]) // MINUTE_MS)
+        offsets = np.arange(self.minutes)
+        index = np.searchsorted(minute_candles[:, 0], candles[:, 0])[:, None] + offsets
+        if index[-1, -1] >= len(minute_candles) or not np.array_equal(
+                minute_candles[index, 0], candles[:, :1] + offsets * MINUTE_MS):
+            raise ValueError("The 1m candles don't cover every minute of the candles.")
+
+        self.open = minute_candles[index, 1]
+        self.high = minute_candles[index, 3]
+        self.low = minute_candles[index, 4]
+
+    def first_touch(self, i: int, levels: np.ndarray, above: bool, after: np.ndarray = None) -> np.ndarray:
+        # Minute of bar i where the price first reaches each level (high >= level when above, low <=
+        # level otherwise), self.minutes when it never does. after: first minute watched per level.
+        if above:
+            touched = self.high[i] >= levels[:, None]
+        else:
+            touched = self.low[i] <= levels[:, None]
+        if after is not None:
+            touched &= np.arange(self.minutes) >= after[:, None]
+        return np.where(touched.any(axis=1), touched.argmax(axis=1), self.minutes)
+
+    def fill_price(self, i: int, levels: np.ndarray, minutes: np.ndarray, above: bool) -> np.ndarray:
+        # Price of the stop orders triggered at the minutes, the minute open when it gapped past them.
+        opens = self.open[i, minutes]
+        return np.maximum(levels, opens) if above else np.minimum(levels, opens)
+
+
+def bar_candles(minute_candles: np.ndarray, minutes: int) -> np.ndarray:
+    # Candles of `minutes` 1m candles each like jesse generates them, from the first 1m candle
+    # starting a bar. The 1m candles must be continuous.
+    first = int(np.argmax(minute_candles[:, 0] % (minutes * MINUTE_MS) == 0))
+    size = (len(minute_candles) - first) // minutes * minutes
+    bars = minute_candles[first:first + size].reshape(-1, minutes, 6)
+    return np.column_stack((bars[:, 0, 0], bars[:, 0, 1], bars[:, -1, 2], bars[:, :, 3].max(axis=1),
+                            bars[:, :, 4].min(axis=1), bars[:, :, 5].sum(axis=1)))
@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+
+import numpy as np
+import ray
+
+
+def effective_hyperparameters(hp: dict, strategy=None) -> dict:
+    effective = dict(hp)
+
+    # Astro signal settings have no effect when the astro filter is disabled, except the shift hour
+    # the breadth filter of the strategy (min_long_breadth) also reads.
+    if effective.get('enable_astro_signal') == 0:
+        breadth_filter = getattr(strategy, 'min_long_breadth', 0) > 0
+        for name in list(effective):
+            if name.startswith('astro_signal_') and not (breadth_filter and name == 'astro_signal_shift_hour'):
+                del effective[name]
+
+    # Same for the BaZi signal settings.
+    if effective.get('enable_bazi_signal') == 0:
+        for name in list(effective):
+            if name.startswith('bazi_signal_'):
+                del effective[name]
+
+    # The MAs only see the integer fast period, not the float devider that produces it.
+    if 'slow_ma_period' in effective and 'fast_ma_devider' in effective:
+        effective['fast_ma_period'] = int(effective['slow_ma_period'] / effective.pop('fast_ma_devider'))
+
+    return effective
+
+
+def canonical_key(hp: dict, strategy=None) -> tuple:
+    return tuple(sorted(effective_hyperparameters(hp, strategy).items()))
+
+
+def random_candidates(strategy, count: int, rng: np.random.Generator) -> list:
+    # Uniform samples of the hyperparameter ranges like jesse's optimizer draws its trials, without
+    # the ones decoding to the effective hyperparameters of an earlier sample.
+    candidates = {}
+    for _ in range(count):
+        hp = {}
+        for parameter in strategy.hyperparameters(None):
+            if parameter['type'] is int:
+                hp[parameter['name']] = int(rng.integers(parameter['min'], parameter['max'] + 1))
+            else:
+                hp[parameter['name']] = float(rng.uniform(parameter['min'], parameter['max']))
+        candidates.setdefault(canonical_key(hp, strategy), hp)
+    return list(candidates.values())
+
+
+@ray.remote
+def reuse_trial(result: dict, trial_number: int, hp: dict) -> dict:
+    # Ray passes the result of the first trial once it's done, relabeled as the duplicate.
+    return dict(result, trial_number=trial_number, params=hp)
+
+
+class DedupTrials:
+    # Stands in for jesse's ray_evaluate_trial in the optimization coordinator: a trial whose hp
+    # decode to the same effective hyperparameters as an earlier one waits for the result of the
+    # earlier one instead of running its backtests on a ray worker.
+
+    def __init__(self, evaluate, strategy=None):
+        self.evaluate = evaluate
+        self.strategy = strategy
+        self.trials = {}
+        self.ray_options = {}
+        self.hits = 0
+        self.misses = 0
+
+    def options(self, **ray_options):
+        self.ray_options = ray_options
+        return self
+
+    def remote(self, *args):
+        # Same arguments as ray_evaluate_trial, the hp 5th and the trial number 12th.
+        hp, trial_number = args[4], args[11]
+        key = canonical_key(hp, self.strategy)
+        first = self.trials.get(key)
+        if first is not None:
+            self.hits += 1
+            return reuse_trial.options(num_cpus=0).remote(first, trial_number, hp)
+
+        self.misses += 1
+        ref = self.evaluate.options(**self.ray_options).remote(*args)
+        self.trials[key] = ref
+        return ref
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@contextmanager
+def deduplicated_trials(strategy=None):
+    # jesse's Optimizer and research.optimize both dispatch the trials through
+    # jesse.modes.optimize_mode.Optimize.ray_evaluate_trial, swapped for a DedupTrials meanwhile.
+    from jesse.modes.optimize_mode import Optimize
+
+    trials = DedupTrials(Optimize.ray_evaluate_trial, strategy)
+    Optimize.ray_evaluate_trial = trials
+    try:
+        yield trials
+    finally:
+        Optimize.ray_evaluate_trial = trials.evaluate
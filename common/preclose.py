@@ -0,0 +1,95 @@
+import threading
+
+import jesse.helpers as jh
+import jesse.indicators as ta
+import numpy as np
+
+# Candles the MA strategies give ta.sma(), candles[-240:].
+SMA_WINDOW = 240
+
+
+def sma_running_sum(closes: np.ndarray, period: int) -> float:
+    # Sum of the last period closes accumulated the way ta.sma() does, so the value finished
+    # from it is bit for bit the ta.sma() one.
+    total = 0.0
+    for close in closes[:period]:
+        total += close
+    for k in range(period, len(closes)):
+        total = total - closes[k - period] + closes[k]
+    return total
+
+
+class PreparedClose:
+    # What can be evaluated of a candle before it closes: the decision inputs that only depend on
+    # its time (given as inputs) and the indicators over the closed candles before it. Once the
+    # candle closes, its last SMA and ATR values are one step away from them.
+
+    def __init__(self, timestamp: float, inputs: dict, closed: np.ndarray, sma_periods, atr_periods, atr_window: int):
+        self.timestamp = timestamp
+        self.inputs = inputs
+        self.previous_close = closed[-1, 2]
+
+        # The SMA window at the close is the last SMA_WINDOW - 1 closed candles and the closing one.
+        self.sma_closes = closed[-(SMA_WINDOW - 1):, 2]
+        self.sma_head = {period: ta.sma(self.sma_closes, period, sequential=True) for period in sma_periods}
+        self.sma_sums = {period: sma_running_sum(self.sma_closes, period) for period in sma_periods}
+
+        # Same for the atr_window candles the ATRs see.
+        self.atr_previous = {period: ta.atr(closed[-(atr_window - 1):], period, sequential=True)[-1]
+                             for period in atr_periods}
+
+    def sma(self, period: int, close: float) -> np.ndarray:
+        # window_sma(period) once the candle closed at close.
+        last = (self.sma_sums[period] - self.sma_closes[-period] + close) / period
+        return np.append(self.sma_head[period], last)
+
+    def atr(self, period: int, candle: np.ndarray) -> float:
+        # window_atr(period) with the closed candle, Wilder's step from the previous value.
+        high, low = candle[3], candle[4]
+        true_range = max(high - low, abs(high - self.previous_close), abs(low - self.previous_close))
+        previous = self.atr_previous[period]
+        return previous + (1.0 / period) * (true_range - previous)
+
+
+class PreCloseMixin:
+    # Live only: preclose_lead seconds before the candle closes a timer thread prepares its
+    # PreparedClose, so at the close the strategy only finishes the price dependent values
+    # instead of evaluating every route from scratch before the stop-entry orders go out.
+    # The strategy implements preclose_inputs(position) and preclose_periods(), the indicators
+    # read the indicator_candles and indicator_warmup of SnapshotMixin.
+
+    preclose_lead = 5
+    preclose_timer = None
+
+    def schedule_preclose(self):
+        # Called at the close of the previous candle.
+        if self.preclose_timer:
+            self.preclose_timer.cancel()
+
+        timeframe_ms = jh.timeframe_to_one_minutes(self.timeframe) * 60_000
+        timestamp = self.candles[-1, 0] + timeframe_ms
+        # The alignment grows from the strategy thread only.
+        self.alignment.ensure(self.candle_position + 1)
+
+        delay = (timestamp + timeframe_ms - jh.now_to_timestamp()) / 1000 - self.preclose_lead
+        self.preclose_timer = threading.Timer(max(delay, 0), self.prepare_close, args=(timestamp,))
+        self.preclose_timer.daemon = True
+        self.preclose_timer.start()
+
+    def prepare_close(self, timestamp: float):
+        candles = self.indicator_candles
+        closed = candles[candles[:, 0] < timestamp]
+        if len(closed) < SMA_WINDOW - 1:
+            return
+
+        sma_periods, atr_periods = self.preclose_periods()
+        inputs = self.preclose_inputs(self.alignment.position_of(timestamp))
+        self.vars['prepared'] = PreparedClose(timestamp, inputs, closed, sma_periods, atr_periods, self.indicator_warmup)
+
+    @property
+    def prepared(self):
+        # The PreparedClose of the current candle, None when it wasn't prepared in time.
+        prepared = self.vars.get('prepared')
+        if prepared is None or prepared.timestamp != self.candles[-1, 0]:
+            return None
+        return prepared
@@ -0,0 +1,48 @@
+import jesse.helpers as jh
+
+from common.warmup import apply_warmup
+from config import config
+
+
+def session_config(routes: list, hp: dict = None) -> dict:
+    # Config of jesse's research backtest and optimize for the routes, from the exchange settings of
+    # config.py and with the warmup the routes need.
+    exchange = routes[0][0]
+    settings = config['exchanges'][exchange]
+    session = {
+        'exchange': {
+            'name': exchange,
+            'balance': settings['assets'][0]['balance'],
+            'fee': settings['fee'],
+            'type': settings['type'],
+            'futures_leverage': settings['futures_leverage'],
+            'futures_leverage_mode': settings['futures_leverage_mode'],
+        },
+    }
+    apply_warmup(session, routes, hp)
+    return session
+
+
+def backtest_config(session: dict) -> dict:
+    # research.backtest() takes the exchange settings flat.
+    exchange = session['exchange']
+    return {'starting_balance': exchange['balance'], 'fee': exchange['fee'], 'type': exchange['type'],
+            'futures_leverage': exchange['futures_leverage'], 'futures_leverage_mode': exchange['futures_leverage_mode'],
+            'exchange': exchange['name'], 'warm_up_candles': session['warm_up_candles']}
+
+
+def session_candles(routes: list, start_date: str, finish_date: str, warmup: int) -> tuple:
+    # 1m candles of the period and of the warmup before it of every route symbol, as jesse's research
+    # functions take them. The warmup counts candles of the route timeframe.
+    from jesse.research import get_candles
+
+    candles = {}
+    warmup_candles = {}
+    for exchange, symbol, timeframe, _ in routes:
+        warmup_route_candles, route_candles = get_candles(exchange, symbol, timeframe, jh.date_to_timestamp(start_date),
+                                                          jh.date_to_timestamp(finish_date), warmup, caching=True,
+                                                          is_for_jesse=True)
+        key = jh.key(exchange, symbol)
+        candles[key] = {'exchange': exchange, 'symbol': symbol, 'candles': route_candles}
+        warmup_candles[key] = {'exchange': exchange, 'symbol': symbol, 'candles': warmup_route_candles}
+    return candles, warmup_candles
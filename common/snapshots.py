@@ -0,0 +1,125 @@
+import math
+import os
+import pickle
+from pathlib import Path
+
+import jesse.helpers as jh
+import jesse.indicators as ta
+import numpy as np
+
+from common.indicators import CandleWindow
+from common.preclose import SMA_WINDOW
+
+SNAPSHOTS_PATH = Path(__file__).parent.parent / 'storage' / 'snapshots'
+# Candles loaded before the snapshot one on a restart, the restore needs to find it among them.
+RESTART_MARGIN = 2
+# Kept in the snapshot of every route along its snapshot_vars.
+WINDOW_VARS = ('window', 'indicator_warmup')
+
+
+def route_snapshot_path(exchange: str, symbol: str, timeframe: str, strategy: str) -> Path:
+    return SNAPSHOTS_PATH / f'{exchange}-{symbol}-{timeframe}-{strategy}.pickle'
+
+
+def load_snapshot(path: Path):
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def restart_warmup(routes: list, now: int = None):
+    # Warmup candles a live session of the routes needs when each of them restores its snapshot:
+    # the candles since the oldest snapshot. None when a route has none, it needs the full warmup.
+    now = jh.now_to_timestamp(force_fresh=True) if now is None else now
+    candles = 0
+    for exchange, symbol, timeframe, strategy in routes:
+        state = load_snapshot(route_snapshot_path(exchange, symbol, timeframe, strategy))
+        if state is None or state['vars'].get('window') is None:
+            return None
+        timeframe_ms = jh.timeframe_to_one_minutes(timeframe) * 60_000
+        candles = max(candles, math.ceil((now - state['timestamp']) / timeframe_ms) + RESTART_MARGIN)
+    return candles
+
+
+class SnapshotMixin:
+    # In live mode the listed vars are pickled at every candle close and restored when the
+    # route starts again, so a restart doesn't lose the attempts, entry or indicator states.
+    #
+    # The windowed indicators read indicator_candles, in live mode a CandleWindow of the candles
+    # they see (the last SMA_WINDOW for ta.sma(), the last warmup_candles_num for the non
+    # sequential ones) pickled with the vars. With the incremental indicators catching up from
+    # their snapshot, a restored route only needs the candles since its snapshot, so the session
+    # can restart with the restart_warmup() of its routes instead of the full warmup.
+
+    snapshot_vars = ()
+    # vars holding a self.index value, they are shifted on restore because the index restarts.
+    snapshot_index_vars = ()
+
+    @property
+    def snapshot_path(self) -> Path:
+        return route_snapshot_path(self.exchange, self.symbol, self.timeframe, type(self).__name__)
+
+    @property
+    def indicator_warmup(self) -> int:
+        # warmup_candles_num of the session the window started in, a restarted session has less.
+        return self.vars.get('indicator_warmup') or jh.get_config('env.data.warmup_candles_num', 240)
+
+    @property
+    def indicator_candles(self) -> np.ndarray:
+        if not jh.is_live():
+            return self.candles
+
+        window = self.vars.get('window')
+        if window is None:
+            self.vars['indicator_warmup'] = self.indicator_warmup
+            window = self.vars['window'] = CandleWindow(max(SMA_WINDOW, self.indicator_warmup))
+        return window.update(self.candles)
+
+    def window_atr(self, period: int) -> float:
+        # ta.atr(self.candles, period) as jesse slices it to the warmup_candles_num last candles,
+        # sequential so the slice doesn't follow the warmup of a restarted session.
+        candles = self.indicator_candles[-self.indicator_warmup:]
+        return ta.atr(candles, period=period, sequential=True)[-1]
+
+    def window_sma(self, period: int) -> np.ndarray:
+        return ta.sma(self.indicator_candles[-SMA_WINDOW:], period=period, source_type="close", sequential=True)
+
+    def save_snapshot(self):
+        # Candles the indicators didn't read this time still go in the window.
+        self.indicator_candles
+        names = self.snapshot_vars + WINDOW_VARS
+        state = {
+            'timestamp': self.candles[-1, 0],
+            'close': self.candles[-1, 2],
+            'index': self.index,
+            'vars': {name: self.vars[name] for name in names if name in self.vars},
+        }
+
+        path = self.snapshot_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix('.tmp')
+        with open(temp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Atomic so a crash while writing never leaves a broken snapshot.
+        os.replace(temp_path, path)
+
+    def restore_snapshot(self) -> bool:
+        state = load_snapshot(self.snapshot_path)
+        if state is None:
+            return False
+
+        # The snapshot candle must still be among the loaded candles and have the same close.
+        rows = np.flatnonzero(self.candles[:, 0] == state['timestamp'])
+        if not len(rows) or self.candles[rows[-1], 2] != state['close']:
+            return False
+
+        candles_since = len(self.candles) - 1 - rows[-1]
+        index_shift = self.index - candles_since - state['index']
+        for name, value in state['vars'].items():
+            if name in self.snapshot_index_vars:
+                value += index_shift
+            self.vars[name] = value
+
+        return True
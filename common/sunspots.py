@@ -0,0 +1,40 @@
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import requests
+
+# Daily total sunspot numbers of SILSO: http://www.sidc.be/silso/
+HISTORICAL_URL = "http://www.sidc.be/silso/INFO/sndtotcsv.php"
+THIS_MONTH_URL = "http://www.sidc.be/silso/DATA/EISN/EISN_current.csv"
+
+
+def read_sunspots(text: str, sep: str, names: list) -> pd.DataFrame:
+    sunspots = pd.read_csv(StringIO(text), sep=sep, header=None, names=names,
+                           usecols=["year", "month", "day", "total"])
+    sunspots.index = pd.to_datetime(sunspots[["year", "month", "day"]])
+    sunspots = sunspots[["total"]].astype(float)
+    sunspots[sunspots < 0] = np.nan
+    return sunspots
+
+
+def fetch_sunspots(since: str = "2000-01-01") -> pd.DataFrame:
+    # Log differences of the daily total sunspot number, the estimates of the current month included.
+    historical = read_sunspots(requests.get(HISTORICAL_URL).text, ";",
+                               ["year", "month", "day", "fraction", "total", "stdev", "observations", "indicator"])
+    this_month = read_sunspots(requests.get(THIS_MONTH_URL).text, ",",
+                               ["year", "month", "day", "fraction", "total", "stdev", "observations", "indicator",
+                                "empty"])
+    merged = pd.concat([historical.loc[since:], this_month])
+    return merged.apply(np.log).diff().dropna()
+
+
+def sunspot_regime(days: np.ndarray, sunspots: pd.DataFrame, fast: str = '30D', slow: str = '240D') -> np.ndarray:
+    # 1 when the fast mean of the sunspots is above the slow one (sunspots_long), -1 when below,
+    # for the nearest sunspot date of each day number.
+    fast_mean = sunspots['total'].rolling(fast).mean().values
+    slow_mean = sunspots['total'].rolling(slow).mean().values
+    regime = np.sign(np.nan_to_num(fast_mean - slow_mean)).astype(np.int8)
+
+    dates = pd.DatetimeIndex(np.asarray(days, dtype='datetime64[D]'))
+    return regime[sunspots.index.get_indexer(dates, method='nearest')]
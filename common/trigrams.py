@@ -0,0 +1,67 @@
+import numpy as np
+
+# Candle pattern trigrams, the id of a trigram is its index. -1 is used for doji candles (close == open).
+# https://de.tradingview.com/script/Cwv7H00X/
+TRIGRAMS = ('Earth', 'Heaven', 'Mountain', 'Fire', 'Water', 'Lake', 'Wind', 'Thunder')
+# yin == 1 yang == 0
+TRIGRAM_SYMBOLS = np.array([
+    [1, 1, 1],  # Earth: Bullish Marubozu
+    [0, 0, 0],  # Heaven: Bearish Marubozu
+    [0, 1, 1],  # Mountain: Bullish Hammer
+    [0, 1, 0],  # Fire: Bearish Hammer
+    [1, 0, 1],  # Water: Bullish Inverted Hammer
+    [1, 0, 0],  # Lake: Bearish Inverted Hammer
+    [0, 0, 1],  # Wind: Bullish Spinning Top
+    [1, 1, 0],  # Thunder: Bearish Spinning Top
+], dtype=np.int8)
+NO_TRIGRAM = -1
+
+
+def equal(a, b, tolerance: float):
+    # Prices closer than tolerance (relative to b) count as equal, 0 means exactly equal.
+    return np.abs(a - b) <= tolerance * np.abs(b)
+
+
+def classify_trigrams(candles: np.ndarray, tolerance: float = 0.0) -> np.ndarray:
+    # Trigram id of every candle (jesse candles: timestamp, open, close, high, low, volume).
+    open = candles[:, 1]
+    close = candles[:, 2]
+    high = candles[:, 3]
+    low = candles[:, 4]
+
+    bullish = close > open
+    bearish = close < open
+    # A bullish candle has no upper wick when high == close and no lower wick when low == open,
+    # a bearish one when high == open and low == close.
+    no_upper_wick = np.where(bullish, equal(high, close, tolerance), equal(high, open, tolerance))
+    no_lower_wick = np.where(bullish, equal(low, open, tolerance), equal(low, close, tolerance))
+
+    conditions = [
+        bullish & no_upper_wick & no_lower_wick,
+        bearish & no_upper_wick & no_lower_wick,
+        bullish & no_upper_wick & ~no_lower_wick,
+        bearish & no_upper_wick & ~no_lower_wick,
+        bullish & ~no_upper_wick & no_lower_wick,
+        bearish & ~no_upper_wick & no_lower_wick,
+        bullish & ~no_upper_wick & ~no_lower_wick,
+        bearish & ~no_upper_wick & ~no_lower_wick,
+    ]
+    return np.select(conditions, np.arange(len(TRIGRAMS), dtype=np.int8), NO_TRIGRAM).astype(np.int8)
+
+
+def candle_trigram(candle: np.ndarray, tolerance: float = 0.0) -> int:
+    # Streaming version for the last candle, same rules as classify_trigrams().
+    _, open, close, high, low = candle[:5]
+    if close == open:
+        return NO_TRIGRAM
+
+    if close > open:
+        no_upper_wick = abs(high - close) <= tolerance * abs(close)
+        no_lower_wick = abs(low - open) <= tolerance * abs(open)
+    else:
+        no_upper_wick = abs(high - open) <= tolerance * abs(open)
+        no_lower_wick = abs(low - close) <= tolerance * abs(close)
+
+    # Pairs of (bullish, bearish) ids: Marubozu, Hammer, Inverted Hammer and Spinning Top.
+    pattern = 2 * (not no_lower_wick) + 4 * (not no_upper_wick)
+    return int(pattern + (close < open))
@@ -0,0 +1,97 @@
+import math
+from collections import namedtuple
+
+import jesse.helpers as jh
+
+# Warmup of a route: candles of its timeframe before the session and days of daily data (sunspots)
+# before its first loaded candle.
+WarmupPlan = namedtuple('WarmupPlan', ['candles', 'days'])
+
+# Share of the seed a Wilder smoothed indicator may still carry when the warmup is over.
+SETTLE_TOLERANCE = 0.01
+
+
+def settle_candles(period: int) -> int:
+    # Wilder smoothing keeps (1 - 1 / period) ** n of its seed after n candles.
+    if period <= 1:
+        return 0
+    return math.ceil(math.log(SETTLE_TOLERANCE) / math.log(1 - 1 / period))
+
+
+# Candles an indicator call needs before its last value no longer depends on where the data starts,
+# by the periods it's called with. Same recurrences as the jesse / TA-Lib and common.indicators ones.
+LOOKBACKS = {
+    # The MA crossings compare the last two values.
+    'sma': lambda period: period + 1,
+    'donchian': lambda period: period,
+    # True range needs the previous close, then the smoothing settles.
+    'atr': lambda period: period + 1 + settle_candles(period),
+    # Smoothed DM / TR first, then the DX average.
+    'adx': lambda period: 2 * period + settle_candles(period),
+    # Smoothed RSI then a WMA of it, the trend starts read the last two values.
+    'ift_rsi': lambda rsi_period, wma_period: rsi_period + 1 + settle_candles(rsi_period) + wma_period,
+    'vwmacd': lambda fast_period, slow_period, signal_period: max(fast_period, slow_period) + signal_period - 1,
+}
+
+
+def hyperparameter_ranges(strategy) -> dict:
+    # hyperparameters() doesn't use the instance, jesse's optimizer reads it the same way.
+    return {parameter['name']: parameter for parameter in strategy.hyperparameters(None)}
+
+
+def warmup_plan(strategy, hp: dict = None) -> WarmupPlan:
+    # Warmup of the strategy class from its warmup_indicators and warmup_days attributes. Periods
+    # given as hyperparameter names use the hp values when given, else the largest of their range
+    # so every optimization candidate is covered.
+    ranges = hyperparameter_ranges(strategy)
+
+    def period_of(period) -> int:
+        if isinstance(period, int):
+            return period
+        if hp is not None and period in hp:
+            return int(hp[period])
+        if period not in ranges:
+            raise ValueError(f"{strategy.__name__} has no hyperparameter {period} for its warmup.")
+        return int(ranges[period]['max'])
+
+    candles = 0
+    for indicator, *periods in getattr(strategy, 'warmup_indicators', ()):
+        if indicator not in LOOKBACKS:
+            raise ValueError(f"Unknown warmup indicator {indicator} in {strategy.__name__}")
+        candles = max(candles, LOOKBACKS[indicator](*map(period_of, periods)))
+
+    return WarmupPlan(candles, getattr(strategy, 'warmup_days', 0))
+
+
+def route_warmups(routes: list, hp: dict = None) -> dict:
+    # Warmup plan of each (exchange, symbol, timeframe, strategy) route, hp by strategy name.
+    from strategies import strategy_class
+
+    hp = hp or {}
+    return {route: warmup_plan(strategy_class(route[3]), hp.get(route[3])) for route in routes}
+
+
+def warmup_candles_num(routes: list, hp: dict = None) -> int:
+    # jesse loads the same warmup for every route, the longest one of the routes.
+    return max(plan.candles for plan in route_warmups(routes, hp).values())
+
+
+def apply_warmup(user_config: dict, routes: list, hp: dict = None) -> int:
+    # Sets the warm_up_candles of the config a jesse session starts with (the user_config of a
+    # backtest, optimize or live mode, or the config of the research functions) and
+    # env.data.warmup_candles_num of the running jesse config to what the routes need.
+    from jesse.config import config
+
+    candles = warmup_candles_num(routes, hp)
+    user_config['warm_up_candles'] = candles
+    config['env']['data']['warmup_candles_num'] = candles
+    return candles
+
+
+def store_warmup(candles: int, sections: tuple = ('backtest', 'live', 'optimization')):
+    # The dashboard starts its backtest, optimize and live sessions with the warm_up_candles of its
+    # stored settings, and the live candles are loaded with the live one. The settings are stored
+    # once the dashboard has been opened.
+    from jesse.modes import data_provider
+
+    data_provider.update_config({section: {'warm_up_candles': candles} for section in sections})
@@ -0,0 +1,89 @@
+import gc
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+
+from common.astro_signals import astro_signal_store
+from common.batch_backtest import BatchResult
+from common.breadth import signal_breadth
+from strategies import STRATEGIES, strategy_class
+
+STRATEGIES_PATH = Path(__file__).parent.parent / 'strategies'
+
+# Everything loaded by the parent before forking, the workers read it through copy-on-write pages.
+preloaded = {}
+
+
+def preload(strategies=None):
+    # Imports the strategies (and with them pandas, jesse and the common modules) and compiles
+    # their astro signal stores, and the breadth matrix of all the assets when one of them filters on it.
+    if strategies is None:
+        strategies = STRATEGIES
+
+    for name in strategies:
+        strategy_class(name)
+        for path in sorted((STRATEGIES_PATH / name).glob('ml-*-USD-daily-index.csv')):
+            astro_signal_store(path)
+    if any(getattr(strategy_class(name), 'min_long_breadth', 0) > 0 for name in strategies):
+        signal_breadth()
+
+
+def preforked_pool(processes: int = None, strategies=None):
+    # Pool of forked workers sharing the preloaded modules and data of this process. Linux / macOS only.
+    preload(strategies)
+    # Move the preloaded objects out of the collector generations, otherwise the first collection
+    # of every worker writes to their pages and copies them.
+    gc.collect()
+    gc.freeze()
+    try:
+        return multiprocessing.get_context('fork').Pool(processes)
+    finally:
+        # The workers are forked by now, the parent can collect its own garbage again.
+        gc.unfreeze()
+
+
+def run_batch_chunk(key: int, candidates: list, start: int, keep_log: bool) -> BatchResult:
+    return preloaded['batches'][key].run(candidates, start, keep_log)
+
+
+class BatchPool:
+    # Splits the candidates of an AstroMABatch over forked workers, the batch (candles, astro
+    # signals and cached indicators) is inherited instead of pickled to every worker. The workers
+    # live until close(), so the next runs neither fork again nor lose the indicator windows the
+    # workers cached in the earlier ones.
+
+    def __init__(self, batch, processes: int = None):
+        self.batch = batch
+        self.key = id(batch)
+        self.processes = processes or multiprocessing.cpu_count()
+        # By key, a worker the pool replaces later is forked with the batches of all the open pools.
+        preloaded.setdefault('batches', {})[self.key] = batch
+        self.pool = preforked_pool(self.processes, strategies=())
+
+    def run(self, candidates: list, start: int = None, keep_log: bool = False) -> BatchResult:
+        chunks = [chunk for chunk in np.array_split(np.arange(len(candidates)), self.processes) if len(chunk)]
+        results = self.pool.starmap(run_batch_chunk, [(self.key, [candidates[i] for i in chunk], start, keep_log)
+                                                      for chunk in chunks])
+
+        # The trades of each chunk number its candidates from 0. Merged by exit candle then candidate,
+        # a serial run() logs the candidates closing on the same candle by exit kind first.
+        log = [(int(chunk[trade[0]]),) + trade[1:] for chunk, result in zip(chunks, results) for trade in result.log]
+        log.sort(key=lambda trade: (trade[2], trade[0]))
+        return BatchResult(
+            np.concatenate([result.balance for result in results]),
+            np.concatenate([result.trades for result in results]),
+            np.concatenate([result.wins for result in results]),
+            log,
+        )
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        preloaded['batches'].pop(self.key, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
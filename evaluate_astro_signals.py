@@ -0,0 +1,33 @@
+import argparse
+
+from common.accuracy import ASSETS, evaluate_assets
+
+# Monthly hit rates of the astro signals of all the assets against the imported candles, e.g.:
+# python evaluate_astro_signals.py 2020-01-01 2021-06-01 --shift-hour 4 --trend-period 2
+
+parser = argparse.ArgumentParser(description='Evaluate the astro signals accuracy of all the assets.')
+parser.add_argument('start_date')
+parser.add_argument('finish_date')
+parser.add_argument('--exchange', default='Binance')
+parser.add_argument('--assets', nargs='+', default=list(ASSETS))
+parser.add_argument('--shift-hour', type=int, default=4)
+parser.add_argument('--trend-period', type=int, default=2)
+parser.add_argument('--threshold', type=float, default=0.5, help='hit rate under which a month is out of sync')
+parser.add_argument('--min-signals', type=int, default=5)
+parser.add_argument('--output', help='csv file for the full report of all the shift hours and trend periods')
+args = parser.parse_args()
+
+report = evaluate_assets(args.exchange, args.start_date, args.finish_date, args.assets)
+if args.output:
+    report.to_csv(args.output)
+
+selected = report.xs((args.shift_hour, args.trend_period), level=('shift_hour', 'trend_period'))
+print(selected['hit_rate'].unstack('asset').round(2).to_string())
+
+out_of_sync = selected[(selected['signals'] >= args.min_signals) & (selected['hit_rate'] < args.threshold)]
+print(f'\nOut of sync months (hit rate < {args.threshold}):')
+print(out_of_sync.to_string() if len(out_of_sync) else 'None')
+
+overall = selected.groupby('asset')[['signals', 'hits']].sum()
+overall['hit_rate'] = overall['hits'] / overall['signals']
+print(f'\nOverall:\n{overall.round(3).to_string()}')
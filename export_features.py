@@ -0,0 +1,33 @@
+import argparse
+
+import jesse.helpers as jh
+from jesse.research import get_candles
+
+from common.features import feature_matrix
+from common.sunspots import fetch_sunspots
+
+# Export the esoteric features of all the strategies for the imported candles, e.g.:
+# python export_features.py Binance BTC-USDT 15m 2020-01-01 2021-01-01 storage/features/BTC-USDT-15m.parquet
+
+parser = argparse.ArgumentParser(description='Export the esoteric feature matrix of a symbol.')
+parser.add_argument('exchange')
+parser.add_argument('symbol')
+parser.add_argument('timeframe')
+parser.add_argument('start_date')
+parser.add_argument('finish_date')
+parser.add_argument('output', help='.parquet (needs pyarrow) or .csv file')
+parser.add_argument('--no-sunspots', action='store_true', help="don't download the sunspot numbers")
+args = parser.parse_args()
+
+_, candles = get_candles(args.exchange, args.symbol, args.timeframe, jh.date_to_timestamp(args.start_date),
+                         jh.date_to_timestamp(args.finish_date))
+
+sunspots = None if args.no_sunspots else fetch_sunspots()
+features = feature_matrix(candles, args.symbol, sunspots)
+
+if args.output.endswith('.csv'):
+    features.to_csv(args.output)
+else:
+    features.to_parquet(args.output)
+
+print(f'{len(features)} candles x {len(features.columns)} features written to {args.output}')
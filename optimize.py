@@ -0,0 +1,45 @@
+import argparse
+
+from common.optimization import deduplicated_trials
+from common.sessions import session_candles, session_config
+from config import config
+from routes import extra_candles, routes
+from strategies import strategy_class
+
+# Optimizes the hyperparameters of a route with jesse's research optimizer, except trials decoding to
+# the same effective hyperparameters (e.g. astro signal settings while the astro signal is disabled)
+# are backtested once, e.g.:
+# python optimize.py 2020-01-01 2021-01-01 2021-04-01 250 --cpu 4
+
+parser = argparse.ArgumentParser(description='Optimize the hyperparameters of a route, deduplicating the trials.')
+parser.add_argument('training_start_date')
+parser.add_argument('testing_start_date')
+parser.add_argument('finish_date')
+parser.add_argument('optimal_total', type=int)
+parser.add_argument('--route', type=int, default=0, help='index of the route in routes.py')
+parser.add_argument('--cpu', type=int, help='CPU cores to use, 80%% of them by default')
+parser.add_argument('--trials', type=int, default=200, help='trials per hyperparameter')
+parser.add_argument('--objective', default=config['optimization']['ratio'], choices=('sharpe', 'calmar', 'sortino', 'omega'))
+args = parser.parse_args()
+
+# Imported here, jesse.research connects to the database on import.
+from jesse import research
+
+route = routes[args.route]
+exchange, symbol, timeframe, strategy = route
+# The warmup of the route's hyperparameter ranges, see common.warmup.
+research_config = session_config([route])
+warmup = research_config['warm_up_candles']
+training_candles, training_warmup_candles = session_candles([route], args.training_start_date,
+                                                            args.testing_start_date, warmup)
+testing_candles, testing_warmup_candles = session_candles([route], args.testing_start_date, args.finish_date, warmup)
+data_routes = [{'symbol': s, 'timeframe': t} for e, s, t in extra_candles if (e, s) == (exchange, symbol)]
+
+with deduplicated_trials(strategy_class(strategy)) as trials:
+    result = research.optimize(research_config, [{'strategy': strategy, 'symbol': symbol, 'timeframe': timeframe}],
+                               data_routes, training_candles, training_warmup_candles, testing_candles,
+                               testing_warmup_candles, optimal_total=args.optimal_total, cpu_cores=args.cpu,
+                               trials=args.trials, objective_function=args.objective)
+
+research.print_optimize_summary(result, show_params=True)
+print(f'Deduplicated trials: {trials.hits} of {trials.hits + trials.misses} reused an earlier backtest')
@@ -0,0 +1,40 @@
+import argparse
+
+from common.snapshots import restart_warmup
+from common.warmup import route_warmups, store_warmup, warmup_candles_num
+from config import config
+from routes import routes
+
+# Warmup candles and days of daily data each route needs for its hyperparameter ranges, e.g.:
+# python plan_warmup.py
+# backtest.py and optimize.py load that warmup. --store saves it in the dashboard settings the
+# backtest, optimize and live sessions of the dashboard start with. --restart --store only sets the
+# live one to the candles since the snapshots of the routes, for a live session restarted now.
+
+parser = argparse.ArgumentParser(description='Plan the warmup candles of the routes.')
+parser.add_argument('--store', action='store_true', help='store the warmup in the dashboard settings')
+parser.add_argument('--restart', action='store_true', help='plan the warmup of a live restart from the snapshots')
+args = parser.parse_args()
+
+for (exchange, symbol, timeframe, strategy), plan in route_warmups(routes).items():
+    print(f'{exchange} {symbol} {timeframe} {strategy}: {plan.candles} candles, {plan.days} days of daily data')
+
+needed = warmup_candles_num(routes)
+configured = config['data']['warmup_candles_num']
+print(f'\nwarmup_candles_num: {needed} needed, {configured} configured')
+if configured < needed:
+    print('The indicators of the first candles are computed on too short a history.')
+elif configured > needed:
+    print(f'{configured - needed} candles per route are loaded for nothing.')
+
+if args.restart:
+    restart = restart_warmup(routes)
+    if restart is None:
+        parser.exit(1, 'A route has no snapshot, the live session needs the full warmup.\n')
+    print(f'restart warmup: {restart} candles since the snapshots')
+    if args.store:
+        store_warmup(restart, sections=('live',))
+        print(f'warm_up_candles of the live session set to {restart}, run --store again once it started')
+elif args.store:
+    store_warmup(needed)
+    print(f'warm_up_candles of the dashboard sessions set to {needed}')
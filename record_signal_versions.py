@@ -0,0 +1,20 @@
+import argparse
+from pathlib import Path
+
+import jesse.helpers as jh
+
+from common.astro_signals import AstroSignals, SignalVersions
+
+# Record the current astro signals files as the vintage published on a date, run it after each
+# refit so the backtests keep using the signals that were known at the candle time, e.g.:
+# python record_signal_versions.py 2021-04-01
+
+parser = argparse.ArgumentParser(description='Record a new vintage of the astro signals files.')
+parser.add_argument('published_date', help='date the signals were published (YYYY-MM-DD)')
+parser.add_argument('--path', default=str(Path(__file__).parent / 'strategies' / 'AstroStrategyMA'))
+args = parser.parse_args()
+
+published = jh.date_to_timestamp(args.published_date)
+for path in sorted(Path(args.path).glob('ml-*-USD-daily-index.csv')):
+    versions = SignalVersions.record(path, AstroSignals.read_csv(path), published)
+    print(f'{path.name}: {len(versions.published)} vintages, {len(versions.deltas["days"])} stored rows')
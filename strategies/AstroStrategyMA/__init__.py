@@ -1,58 +1,83 @@
-from datetime import datetime
 from pathlib import Path
 
+import jesse.helpers as jh
 import jesse.indicators as ta
-import pandas as pd
+import numpy as np
 from jesse import utils
 from jesse.strategies import Strategy, cached
 
-
-class AstroStrategyMA(Strategy):
+from common.astro_signals import astro_signal_store
+from common.attempts import EntryAttempts
+from common.breadth import signal_breadth
+from common.candle_time import CandleTimeMixin
+from common.event_log import EventLogMixin
+from common.indicators import IncrementalADX
+from common.preclose import PreCloseMixin
+from common.snapshots import SnapshotMixin
+
+
+class AstroStrategyMA(CandleTimeMixin, SnapshotMixin, PreCloseMixin, EventLogMixin, Strategy):
+    snapshot_vars = ('attempts', 'entry', 'adx')
+    # Portfolio filter: only enter when at least this share of all the assets is astro bullish, 0 disables it.
+    min_long_breadth = 0.0
+    # Indicator calls and the hyperparameters (or periods) they run with, for common.warmup.
+    warmup_indicators = (
+        ('atr', 'entry_atr_period'), ('atr', 'stop_atr_period'), ('atr', 'take_profit_atr_period'),
+        ('sma', 'slow_ma_period'), ('adx', 14),
+    )
 
     def __init__(self):
         super().__init__()
-        self.vars['attempts'] = {}
-
-    def current_candle_date(self) -> datetime:
-        return datetime.fromtimestamp(self.candles[-1, 0] / 1000).replace(hour=0, minute=0, second=0, microsecond=0)
-
-    def current_candle_hour(self) -> int:
-        return datetime.fromtimestamp(self.candles[-1, 0] / 1000).hour
+        self.vars['attempts'] = EntryAttempts()
+        self.vars['adx'] = IncrementalADX()
 
     def load_astro_data(self):
         here = Path(__file__).parent
         # Dynamically determine the right csv from the self.symbol and shift the index 1 day.
         symbol_parts = self.symbol.split('-')
         astro_asset_indicator_path = here / './ml-{}-USD-daily-index.csv'.format(symbol_parts[0])
-        self.vars['astro_asset'] = pd.read_csv(astro_asset_indicator_path, parse_dates=['Date'], index_col=0)
+        self.vars['astro_asset'] = astro_signal_store(astro_asset_indicator_path, watch=jh.is_live())
+        # All the assets' signals are only read when the breadth filter is on.
+        if self.min_long_breadth > 0:
+            self.vars['breadth'] = signal_breadth()
 
     def before(self):
         if self.index == 0:
             self.load_astro_data()
-
-        # Filter past data.
-        candle_date = self.current_candle_date()
-        self.vars['astro_asset'] = self.vars['astro_asset'].loc[candle_date:]
+            if jh.is_live():
+                self.restore_snapshot()
+
+        # Swap in refreshed astro signals between candles.
+        self.vars['astro_asset'].refresh()
+
+    def after(self):
+        if jh.is_live():
+            self.save_snapshot()
+            self.schedule_preclose()
+            self.log_trading_candle()
+            self.log_event('balance_update', balance=self.balance)
+
+    def preclose_periods(self):
+        return ((self.fast_ma_period, self.hp['slow_ma_period']),
+                (self.hp['entry_atr_period'], self.hp['stop_atr_period'], self.hp['take_profit_atr_period']))
+
+    def preclose_inputs(self, position: int) -> dict:
+        # The astro decision and breadth only depend on the candle time.
+        signals = self.vars['astro_asset'].signals
+        return {
+            'signals': signals,
+            'astro_signal': self.astro_signal_period_decision(signals, position),
+            'astro_breadth': self.astro_breadth_at(position) if self.min_long_breadth > 0 else None,
+        }
 
     def increase_entry_attempt(self):
-        candle_date = str(datetime.fromtimestamp(self.current_candle[0] / 1000).date())
-        # Init date attempts counter.
-        if candle_date not in self.vars['attempts']:
-            self.vars['attempts'][candle_date] = 0
-
         # Count the entry attempt.
-        self.vars['attempts'][candle_date] += 1
+        self.vars['attempts'].increase(self.current_candle_day())
 
     @property
     def are_attempts_exceeded(self) -> bool:
-        candle_date = str(datetime.fromtimestamp(self.current_candle[0] / 1000).date())
-
-        if candle_date not in self.vars['attempts']:
-            return False
-
         # Limit to N entry attempt per day.
-        if self.vars['attempts'][candle_date] >= self.hp['max_day_attempts']:
-            return True
+        return self.vars['attempts'].exceeded(self.current_candle_day(), self.hp['max_day_attempts'])
 
     def should_long(self) -> bool:
         if self.is_bull_astro_signal and self.is_bull_trend_start and not self.are_attempts_exceeded:
@@ -70,7 +95,10 @@ class AstroStrategyMA(Strategy):
 
     def filters(self):
         # candle_date = datetime.fromtimestamp(self.current_candle[0] / 1000)
-        return []
+        return [self.filter_astro_breadth]
+
+    def filter_astro_breadth(self) -> bool:
+        return not self.min_long_breadth or self.astro_breadth >= self.min_long_breadth
 
     def go_long(self):
         entry = self.price + self.entry_atr * self.hp['entry_stop_atr_rate']
@@ -81,6 +109,8 @@ class AstroStrategyMA(Strategy):
         self.stop_loss = position_size, stop
         take_profit = self.take_profit_long(entry)
         self.take_profit = position_size, take_profit
+        self.log_event('order_submission', side='buy', qty=position_size, entry=entry, stop=stop,
+                       take_profit=take_profit)
 
     def go_short(self):
         entry = self.price - self.entry_atr * self.hp['entry_stop_atr_rate']
@@ -93,6 +123,8 @@ class AstroStrategyMA(Strategy):
         self.sell = position_size, entry
         self.stop_loss = position_size, stop
         self.take_profit = position_size, take_profit
+        self.log_event('order_submission', side='sell', qty=position_size, entry=entry, stop=stop,
+                       take_profit=take_profit)
 
     def should_cancel(self) -> bool:
         return True
@@ -159,17 +191,23 @@ class AstroStrategyMA(Strategy):
     @property
     @cached
     def adx(self):
-        return ta.adx(self.candles)
+        return self.vars['adx'].update(self.candles)
+
+    def closing_atr(self, period: int) -> float:
+        prepared = self.prepared
+        if prepared:
+            return prepared.atr(period, self.candles[-1])
+        return self.window_atr(period)
 
     @property
     @cached
     def stop_atr(self):
-        return ta.atr(self.candles, period=self.hp['stop_atr_period'])
+        return self.closing_atr(self.hp['stop_atr_period'])
 
     @property
     @cached
     def entry_atr(self):
-        return ta.atr(self.candles, period=self.hp['entry_atr_period'])
+        return self.closing_atr(self.hp['entry_atr_period'])
 
     @property
     def stop_loss_long(self):
@@ -188,21 +226,30 @@ class AstroStrategyMA(Strategy):
     @property
     @cached
     def take_profit_atr(self):
-        return ta.atr(self.candles, period=self.hp['take_profit_atr_period'])
+        return self.closing_atr(self.hp['take_profit_atr_period'])
+
+    def closing_sma(self, period: int) -> np.ndarray:
+        prepared = self.prepared
+        if prepared:
+            return prepared.sma(period, self.candles[-1, 2])
+        return self.window_sma(period)
+
+    @property
+    def fast_ma_period(self) -> int:
+        return int(self.hp['slow_ma_period'] / self.hp['fast_ma_devider'])
 
     @property
     @cached
     def fast_ma(self):
-        period = int(self.hp['slow_ma_period'] / self.hp['fast_ma_devider'])
-        return ta.sma(self.candles[-240:], period=period, source_type="close", sequential=True)
+        return self.closing_sma(self.fast_ma_period)
 
     @property
     @cached
     def slow_ma(self):
-        return ta.sma(self.candles[-240:], period=self.hp['slow_ma_period'], source_type="close", sequential=True)
+        return self.closing_sma(self.hp['slow_ma_period'])
 
-    def astro_indicator_day_index(self):
-        candle_hour = self.current_candle_hour()
+    def astro_indicator_day_index(self, position: int = None):
+        candle_hour = self.current_candle_hour() if position is None else self.alignment.hour(position)
         # Use next day signal after shift hour due the fact that astro models are train with
         # mid price (OHLC / 4) so the price action predicted by next day is lagged.
         day_index = 0
@@ -210,24 +257,35 @@ class AstroStrategyMA(Strategy):
             day_index = 1
         return day_index
 
-    def astro_signal_period_decision(self, astro_indicator):
-        start_index = self.astro_indicator_day_index()
+    def astro_signal_period_decision(self, astro_indicator, position: int = None):
+        start_index = self.astro_indicator_day_index(position)
+        day = self.current_candle_day() if position is None else self.alignment.day(position)
+        # Trends where a signal won by less than N model votes are too weak, see AstroSignals.margins().
+        if astro_indicator.margins(day, start_index, self.hp['astro_signal_trend_period'])[0] < \
+                self.hp['astro_signal_min_margin']:
+            return 'neutral'
         # Select next N signals in order to determine that there is astro energy trend.
-        end_index = start_index + self.hp['astro_signal_trend_period']
-        signals = astro_indicator.iloc[start_index:end_index]
-        count_signals = len(signals)
-        buy_signals = signals[signals['Action'] == 'buy']
-        sell_signals = signals[signals['Action'] == 'sell']
+        return astro_indicator.decision(day, start_index, self.hp['astro_signal_trend_period'])
 
-        if (count_signals == len(buy_signals)):
-            return 'buy'
-        elif (count_signals == len(sell_signals)):
-            return 'sell'
+    def astro_breadth_at(self, position: int = None) -> float:
+        # Share of all the assets with a bullish astro signal on the first day of the decision.
+        day = self.current_candle_day() if position is None else self.alignment.day(position)
+        return self.vars['breadth'].breadth_at(day + self.astro_indicator_day_index(position))
 
-        return 'neutral'
+    @property
+    def astro_breadth(self) -> float:
+        prepared = self.prepared
+        if prepared:
+            return prepared.inputs['astro_breadth']
+        return self.astro_breadth_at()
 
     def astro_asset_signal(self):
-        return self.astro_signal_period_decision(self.vars['astro_asset'])
+        signals = self.vars['astro_asset'].signals_at(self.candles[-1, 0])
+        prepared = self.prepared
+        # Prepared ahead of the close unless refreshed signals were swapped in since.
+        if prepared and prepared.inputs['signals'] is signals:
+            return prepared.inputs['astro_signal']
+        return self.astro_signal_period_decision(signals)
 
     @property
     def is_bull_astro_signal(self) -> bool:
@@ -262,6 +320,7 @@ class AstroStrategyMA(Strategy):
             {'name': 'max_day_attempts', 'type': int, 'min': 1, 'max': 5, 'default': 4},
             {'name': 'astro_signal_trend_period', 'type': int, 'min': 1, 'max': 5, 'default': 2},
             {'name': 'astro_signal_shift_hour', 'type': int, 'min': 0, 'max': 23, 'default': 4},
+            {'name': 'astro_signal_min_margin', 'type': int, 'min': 0, 'max': 7, 'default': 0},
             {'name': 'enable_astro_signal', 'type': int, 'min': 0, 'max': 1, 'default': 1},
             {'name': 'slow_ma_period', 'type': int, 'min': 50, 'max': 100, 'default': 62},
             {'name': 'fast_ma_devider', 'type': float, 'min': 2, 'max': 10, 'default': 2},
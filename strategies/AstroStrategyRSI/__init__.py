@@ -1,58 +1,58 @@
-from datetime import datetime
 from pathlib import Path
 
-import jesse.indicators as ta
-import pandas as pd
+import jesse.helpers as jh
 from jesse import utils
 from jesse.strategies import Strategy, cached
 
+from common.astro_signals import astro_signal_store
+from common.attempts import EntryAttempts
+from common.candle_time import CandleTimeMixin
+from common.indicators import IncrementalADX, IncrementalIFTRSI
+from common.snapshots import SnapshotMixin
 
-class AstroStrategyRSI(Strategy):
+
+class AstroStrategyRSI(CandleTimeMixin, SnapshotMixin, Strategy):
+    snapshot_vars = ('attempts', 'entry', 'adx', 'rsi', 'last_rsi_cross_long', 'last_rsi_cross_short')
+    snapshot_index_vars = ('last_rsi_cross_long', 'last_rsi_cross_short')
+    warmup_indicators = (
+        ('atr', 'entry_atr_period'), ('atr', 'stop_atr_period'), ('atr', 'take_profit_atr_period'),
+        ('sma', 'slow_ma_period'), ('adx', 14), ('ift_rsi', 5, 9),
+    )
 
     def __init__(self):
         super().__init__()
-        self.vars['attempts'] = {}
-
-    def current_candle_date(self) -> datetime:
-        return datetime.fromtimestamp(self.candles[-1, 0] / 1000).replace(hour=0, minute=0, second=0, microsecond=0)
-
-    def current_candle_hour(self) -> int:
-        return datetime.fromtimestamp(self.candles[-1, 0] / 1000).hour
+        self.vars['attempts'] = EntryAttempts()
+        self.vars['adx'] = IncrementalADX()
+        self.vars['rsi'] = IncrementalIFTRSI()
 
     def load_astro_data(self):
         here = Path(__file__).parent
         # Dynamically determine the right csv from the self.symbol and shift the index 1 day.
         symbol_parts = self.symbol.split('-')
         astro_asset_indicator_path = here / './ml-{}-USD-daily-index.csv'.format(symbol_parts[0])
-        self.vars['astro_asset'] = pd.read_csv(astro_asset_indicator_path, parse_dates=['Date'], index_col=0)
+        self.vars['astro_asset'] = astro_signal_store(astro_asset_indicator_path, watch=jh.is_live())
 
     def before(self):
         if self.index == 0:
             self.load_astro_data()
+            if jh.is_live():
+                self.restore_snapshot()
 
-        # Filter past data.
-        candle_date = self.current_candle_date()
-        self.vars['astro_asset'] = self.vars['astro_asset'].loc[candle_date:]
+        # Swap in refreshed astro signals between candles.
+        self.vars['astro_asset'].refresh()
 
-    def increase_entry_attempt(self):
-        candle_date = str(datetime.fromtimestamp(self.current_candle[0] / 1000).date())
-        # Init date attempts counter.
-        if candle_date not in self.vars['attempts']:
-            self.vars['attempts'][candle_date] = 0
+    def after(self):
+        if jh.is_live():
+            self.save_snapshot()
 
+    def increase_entry_attempt(self):
         # Count the entry attempt.
-        self.vars['attempts'][candle_date] += 1
+        self.vars['attempts'].increase(self.current_candle_day())
 
     @property
     def are_attempts_exceeded(self) -> bool:
-        candle_date = str(datetime.fromtimestamp(self.current_candle[0] / 1000).date())
-
-        if candle_date not in self.vars['attempts']:
-            return False
-
         # Limit to N entry attempt per day.
-        if self.vars['attempts'][candle_date] >= self.hp['max_day_attempts']:
-            return True
+        return self.vars['attempts'].exceeded(self.current_candle_day(), self.hp['max_day_attempts'])
 
     def should_long(self) -> bool:
         if self.is_bull_astro_signal and self.is_bull_trend_start and not self.are_attempts_exceeded:
@@ -160,22 +160,23 @@ class AstroStrategyRSI(Strategy):
     @property
     @cached
     def rsi(self):
-        return ta.ift_rsi(self.candles, sequential=True)
+        # Only the last two values are read by the trend start checks.
+        return self.vars['rsi'].update(self.candles)
 
     @property
     @cached
     def adx(self):
-        return ta.adx(self.candles)
+        return self.vars['adx'].update(self.candles)
 
     @property
     @cached
     def stop_atr(self):
-        return ta.atr(self.candles, period=self.hp['stop_atr_period'])
+        return self.window_atr(self.hp['stop_atr_period'])
 
     @property
     @cached
     def entry_atr(self):
-        return ta.atr(self.candles, period=self.hp['entry_atr_period'])
+        return self.window_atr(self.hp['entry_atr_period'])
 
     @property
     def stop_loss_long(self):
@@ -194,18 +195,18 @@ class AstroStrategyRSI(Strategy):
     @property
     @cached
     def take_profit_atr(self):
-        return ta.atr(self.candles, period=self.hp['take_profit_atr_period'])
+        return self.window_atr(self.hp['take_profit_atr_period'])
 
     @property
     @cached
     def fast_ma(self):
         period = int(self.hp['slow_ma_period'] / self.hp['fast_ma_devider'])
-        return ta.sma(self.candles[-240:], period=period, source_type="close", sequential=True)
+        return self.window_sma(period)
 
     @property
     @cached
     def slow_ma(self):
-        return ta.sma(self.candles[-240:], period=self.hp['slow_ma_period'], source_type="close", sequential=True)
+        return self.window_sma(self.hp['slow_ma_period'])
 
     def astro_indicator_day_index(self):
         candle_hour = self.current_candle_hour()
@@ -218,22 +219,16 @@ class AstroStrategyRSI(Strategy):
 
     def astro_signal_period_decision(self, astro_indicator):
         start_index = self.astro_indicator_day_index()
+        day = self.current_candle_day()
+        # Trends where a signal won by less than N model votes are too weak, see AstroSignals.margins().
+        if astro_indicator.margins(day, start_index, self.hp['astro_signal_trend_period'])[0] < \
+                self.hp['astro_signal_min_margin']:
+            return 'neutral'
         # Select next N signals in order to determine that there is astro energy trend.
-        end_index = start_index + self.hp['astro_signal_trend_period']
-        signals = astro_indicator.iloc[start_index:end_index]
-        count_signals = len(signals)
-        buy_signals = signals[signals['Action'] == 'buy']
-        sell_signals = signals[signals['Action'] == 'sell']
-
-        if (count_signals == len(buy_signals)):
-            return 'buy'
-        elif (count_signals == len(sell_signals)):
-            return 'sell'
-
-        return 'neutral'
+        return astro_indicator.decision(day, start_index, self.hp['astro_signal_trend_period'])
 
     def astro_asset_signal(self):
-        return self.astro_signal_period_decision(self.vars['astro_asset'])
+        return self.astro_signal_period_decision(self.vars['astro_asset'].signals_at(self.candles[-1, 0]))
 
     @property
     def is_bull_astro_signal(self) -> bool:
@@ -268,6 +263,7 @@ class AstroStrategyRSI(Strategy):
             {'name': 'max_day_attempts', 'type': int, 'min': 1, 'max': 5, 'default': 4},
             {'name': 'astro_signal_trend_period', 'type': int, 'min': 1, 'max': 5, 'default': 2},
             {'name': 'astro_signal_shift_hour', 'type': int, 'min': 0, 'max': 23, 'default': 4},
+            {'name': 'astro_signal_min_margin', 'type': int, 'min': 0, 'max': 7, 'default': 0},
             {'name': 'enable_astro_signal', 'type': int, 'min': 0, 'max': 1, 'default': 1},
             {'name': 'slow_ma_period', 'type': int, 'min': 50, 'max': 100, 'default': 62},
             {'name': 'fast_ma_devider', 'type': float, 'min': 2, 'max': 10, 'default': 2},
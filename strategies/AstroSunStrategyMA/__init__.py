@@ -1,79 +1,73 @@
-from datetime import datetime
-from io import StringIO
 from pathlib import Path
 
-import jesse.indicators as ta
+import jesse.helpers as jh
 import numpy as np
-import pandas as pd
-import requests
 from jesse import utils
 from jesse.strategies import Strategy, cached
 
+from common.astro_signals import astro_signal_store
+from common.attempts import EntryAttempts
+from common.candle_time import CandleTimeMixin
+from common.indicators import IncrementalADX
+from common.snapshots import SnapshotMixin
+from common.sunspots import fetch_sunspots
 
-class AstroSunStrategyMA(Strategy):
+
+class AstroSunStrategyMA(CandleTimeMixin, SnapshotMixin, Strategy):
+    snapshot_vars = ('attempts', 'entry', 'adx')
+    warmup_indicators = (
+        ('atr', 'entry_atr_period'), ('atr', 'stop_atr_period'), ('atr', 'take_profit_atr_period'),
+        ('sma', 'slow_ma_period'), ('adx', 14),
+    )
+    # Days of sunspots before the first candle for the slow (240 days) sunspot mean.
+    warmup_days = 240
 
     def __init__(self):
         super().__init__()
-        self.vars['attempts'] = {}
-
-    def current_candle_date(self) -> datetime:
-        return datetime.fromtimestamp(self.candles[-1, 0] / 1000).replace(hour=0, minute=0, second=0, microsecond=0)
-
-    def current_candle_hour(self) -> int:
-        return datetime.fromtimestamp(self.candles[-1, 0] / 1000).hour
+        self.vars['attempts'] = EntryAttempts()
+        self.vars['adx'] = IncrementalADX()
 
     def load_astro_data(self):
         here = Path(__file__).parent
         # Dynamically determine the right csv from the self.symbol and shift the index 1 day.
         symbol_parts = self.symbol.split('-')
         astro_asset_indicator_path = here / './ml-{}-USD-daily-index.csv'.format(symbol_parts[0])
-        self.vars['astro_asset'] = pd.read_csv(astro_asset_indicator_path, parse_dates=['Date'], index_col=0)
-
-        historical_url = "http://www.sidc.be/silso/INFO/sndtotcsv.php"
-        this_month_url = "http://www.sidc.be/silso/DATA/EISN/EISN_current.csv"
-        historical_sunspots = requests.get(historical_url).text
-        this_month_sunspots = requests.get(this_month_url).text
-        historical_sunspots = pd.read_csv(StringIO(historical_sunspots), sep=";", header=None, names=["year", "month", "day", "fraction", "total", "stdev", "observations", "indicator"], parse_dates=[['year', 'month', "day"]], index_col="year_month_day", usecols=["year", "month", "day", "total"])
-        historical_sunspots[historical_sunspots < 0] = np.nan
-        historical_sunspots = historical_sunspots.loc["2000-01-01":]
-        this_month_sunspots = pd.read_csv(StringIO(this_month_sunspots), sep=",", header=None, names=["year", "month", "day", "fraction", "total", "stdev", "observations", "indicator", "empty"], parse_dates=[['year', 'month', "day"]], index_col="year_month_day", usecols=["year", "month", "day", "total"])
-        this_month_sunspots[this_month_sunspots < 0] = np.nan
-        merged = historical_sunspots.append(this_month_sunspots)
-        log_diff = merged.apply(np.log).diff()
-        self.vars['sunspots'] = log_diff.dropna()
+        self.vars['astro_asset'] = astro_signal_store(astro_asset_indicator_path, watch=jh.is_live())
+
+        # Only the days the slow sunspot mean of the first candle reaches back to, one more for the log difference.
+        first_day = np.datetime64(int(self.candles[0, 0]), 'ms').astype('datetime64[D]')
+        self.vars['sunspots'] = fetch_sunspots(since=str(first_day - self.warmup_days - 1))
 
     def before(self):
         if self.index == 0:
             self.load_astro_data()
+            if jh.is_live():
+                self.restore_snapshot()
+
+        # Swap in refreshed astro signals between candles.
+        self.vars['astro_asset'].refresh()
 
-        # Filter past data.
-        candle_date = self.current_candle_date()
-        self.vars['astro_asset'] = self.vars['astro_asset'].loc[candle_date:]
-        self.vars['sunspots'] = self.vars['sunspots'].iloc[self.vars['sunspots'].index.get_loc(self.candle_date, method='nearest') - 240:]
+        self.vars['sunspots'] = self.vars['sunspots'].iloc[max(self.sunspot_row() - self.warmup_days, 0):]
         self.vars['sunspots']['slow_mean'] = self.vars['sunspots'].total.rolling('240D').mean()
         self.vars['sunspots']['fast_mean'] = self.vars['sunspots'].total.rolling('30D').mean()
 
-    def increase_entry_attempt(self):
-        # Init date attempts counter.
-        if self.candle_date not in self.vars['attempts']:
-            self.vars['attempts'][self.candle_date] = 0
+    def after(self):
+        if jh.is_live():
+            self.save_snapshot()
 
+    def increase_entry_attempt(self):
         # Count the entry attempt.
-        self.vars['attempts'][self.candle_date] += 1
+        self.vars['attempts'].increase(self.current_candle_day())
 
     @property
     @cached
     def candle_date(self):
-        return str(datetime.fromtimestamp(self.current_candle[0] / 1000).date())
+        return self.current_candle_date_key()
 
     @property
     def are_attempts_exceeded(self) -> bool:
-        if self.candle_date not in self.vars['attempts']:
-            return False
-
         # Limit to N entry attempt per day.
-        if self.vars['attempts'][self.candle_date] >= self.hp['max_day_attempts']:
-            return True
+        return self.vars['attempts'].exceeded(self.current_candle_day(), self.hp['max_day_attempts'])
 
     def should_long(self) -> bool:
         if self.is_bull_astro_signal and self.is_bull_trend_start and self.sunspots_long and not self.are_attempts_exceeded:
@@ -157,10 +151,14 @@ class AstroSunStrategyMA(Strategy):
     def sunspots_short(self):
         return self.current_sunspot.fast_mean < self.current_sunspot.slow_mean
 
+    def sunspot_row(self) -> int:
+        # Row of the sunspot date nearest to the candle date.
+        return int(self.vars['sunspots'].index.get_indexer([np.datetime64(self.candle_date)], method='nearest')[0])
+
     @property
     @cached
     def current_sunspot(self):
-        return self.vars['sunspots'].iloc[self.vars['sunspots'].index.get_loc(self.candle_date, method='nearest')]
+        return self.vars['sunspots'].iloc[self.sunspot_row()]
 
     @property
     @cached
@@ -175,22 +173,22 @@ class AstroSunStrategyMA(Strategy):
     @property
     @cached
     def adx(self):
-        return ta.adx(self.candles)
+        return self.vars['adx'].update(self.candles)
 
     @property
     @cached
     def stop_atr(self):
-        return ta.atr(self.candles, period=self.hp['stop_atr_period'])
+        return self.window_atr(self.hp['stop_atr_period'])
 
     @property
     @cached
     def entry_atr(self):
-        return ta.atr(self.candles, period=self.hp['entry_atr_period'])
+        return self.window_atr(self.hp['entry_atr_period'])
 
     @property
     @cached
     def take_profit_atr(self):
-        return ta.atr(self.candles, period=self.hp['take_profit_atr_period'])
+        return self.window_atr(self.hp['take_profit_atr_period'])
 
     def take_profit_short(self, price):
         take_profit = price - (self.take_profit_atr * self.hp['take_profit_atr_rate'])
@@ -220,12 +218,12 @@ class AstroSunStrategyMA(Strategy):
     @cached
     def fast_ma(self):
         period = int(self.hp['slow_ma_period'] / self.hp['fast_ma_devider'])
-        return ta.sma(self.candles[-240:], period = period, source_type = "close", sequential=True)
+        return self.window_sma(period)
 
     @property
     @cached
     def slow_ma(self):
-        return ta.sma(self.candles[-240:], period = self.hp['slow_ma_period'], source_type = "close", sequential=True)
+        return self.window_sma(self.hp['slow_ma_period'])
 
     def astro_indicator_day_index(self):
         candle_hour = self.current_candle_hour()
@@ -238,23 +236,17 @@ class AstroSunStrategyMA(Strategy):
 
     def astro_signal_period_decision(self, astro_indicator):
         start_index = self.astro_indicator_day_index()
+        day = self.current_candle_day()
+        # Trends where a signal won by less than N model votes are too weak, see AstroSignals.margins().
+        if astro_indicator.margins(day, start_index, self.hp['astro_signal_trend_period'])[0] < \
+                self.hp['astro_signal_min_margin']:
+            return 'neutral'
         # Select next N signals in order to determine that there is astro energy trend.
-        end_index = start_index + self.hp['astro_signal_trend_period']
-        signals = astro_indicator.iloc[start_index:end_index]
-        count_signals = len(signals)
-        buy_signals = signals[signals['Action'] == 'buy']
-        sell_signals = signals[signals['Action'] == 'sell']
-
-        if (count_signals == len(buy_signals)):
-            return 'buy'
-        elif (count_signals == len(sell_signals)):
-            return 'sell'
-
-        return 'neutral'
+        return astro_indicator.decision(day, start_index, self.hp['astro_signal_trend_period'])
 
 
     def astro_asset_signal(self):
-        return self.astro_signal_period_decision(self.vars['astro_asset'])
+        return self.astro_signal_period_decision(self.vars['astro_asset'].signals_at(self.candles[-1, 0]))
 
     @property
     def is_bull_astro_signal(self) -> bool:
@@ -289,6 +281,7 @@ class AstroSunStrategyMA(Strategy):
             {'name': 'max_day_attempts', 'type': int, 'min': 1, 'max': 5, 'default': 4},
             {'name': 'astro_signal_trend_period', 'type': int, 'min': 1, 'max': 5, 'default': 2},
             {'name': 'astro_signal_shift_hour', 'type': int, 'min': 0, 'max': 23, 'default': 4},
+            {'name': 'astro_signal_min_margin', 'type': int, 'min': 0, 'max': 7, 'default': 0},
             {'name': 'enable_astro_signal', 'type': int, 'min': 0, 'max': 1, 'default': 1},
             {'name': 'slow_ma_period', 'type': int, 'min': 50, 'max': 100, 'default': 62},
             {'name': 'fast_ma_devider', 'type': float, 'min': 2, 'max': 10, 'default': 2},
@@ -1,30 +1,39 @@
 from datetime import datetime, timedelta, date
 from pathlib import Path
 
-import ephem
 import jesse.indicators as ta
 import numpy as np
 import pandas as pd
 from jesse import utils
 from jesse.strategies import Strategy, cached
 
-
-class BaZi(Strategy):
+from common.alignment import TimeframeAlignment
+from common.candle_time import CandleTimeMixin
+from common.ephemeris import solar_table
+from common.flying_stars import FlyingStars
+from common.hour_pillars import HourPillars
+from common.indicators import IncrementalDonchian, IncrementalVWMACD
+from common.trigrams import candle_trigram
+
+
+class BaZi(CandleTimeMixin, Strategy):
+    # Observer of the local solar time, see common.ephemeris.OBSERVERS.
+    solar_time_observer = 'Van Nuys'
+    # Relative difference up to which prices count as equal for the candle trigrams.
+    trigram_tolerance = 0.0
+    # Periods of the indicators, see common.warmup.
+    warmup_indicators = (
+        ('atr', 'entry_atr_period'), ('atr', 'stop_atr_period'), ('atr', 'take_profit_atr_period'),
+        ('donchian', 'stop_dc_period'), ('vwmacd', 12, 26, 9),
+    )
 
     def __init__(self):
         super().__init__()
-
-    @property
-    def current_candle_date(self) -> datetime:
-        return datetime.fromtimestamp(self.candles[-1, 0] / 1000).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.vars['vmacd'] = IncrementalVWMACD()
 
     @property
     def now_candle_date(self) -> datetime:
-        return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=2)
-
-    @property
-    def current_candle_hour(self) -> int:
-        return datetime.fromtimestamp(self.candles[-1, 0] / 1000).hour
+        return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=2)
 
     def load_bazi_data(self):
         here = Path(__file__).parent
@@ -47,23 +56,29 @@ class BaZi(Strategy):
         bazi_iching = here / './bazi_iching.csv'
 
         # https://www.hko.gov.hk/en/gts/time/stemsandbranches.htm
-        bazi_relationship_day_hour_stem = here / './bazi_relationship_day_hour_stem.csv'
-        bazi_relationship_year_month_stem = here / './bazi_relationship_year_month_stem.csv'
+        bazi_relationship_day_hour_stem = here / './bazi_relationship_day_hour_stem.CSV'
+        bazi_relationship_year_month_stem = here / './bazi_relationship_year_month_stem.CSV'
 
         # Na Yin http://www.fengshuimestari.fi/Na_Yin.html
         bazi_wuxing_nayin = here / './bazi_wuxing_nayin.csv'
 
-        self.vars['bazi'] = pd.read_csv(bazi_calendar_path, sep=',', parse_dates={'date': ['Year', 'Month', 'Day']},
-                                        index_col="date").loc[:self.now_candle_date]
+        bazi_calendar = pd.read_csv(bazi_calendar_path, sep=',', parse_dates={'date': ['Year', 'Month', 'Day']},
+                                    index_col="date")
+        self.vars['bazi'] = bazi_calendar.loc[:self.now_candle_date]
         # self.vars['bazi'].info()
 
+        # Solar time table over the whole calendar so the cached file doesn't change every day.
+        calendar_days = bazi_calendar.index.values.astype('datetime64[D]').astype(np.int64)
+        self.vars['solar_table'] = solar_table(self.solar_time_observer, int(calendar_days.min()),
+                                               int(calendar_days.max()))
+
         export = pd.read_csv(bazi_calendar_path, sep=',', parse_dates={'date': ['Year', 'Month', 'Day']},
                              index_col="date").loc[date(year=2019, month=1, day=1):date(year=2022, month=12, day=31)]
 
         # Todo: Try local solar time / shift hours for europe (or BTC Birthplace) - as Calendar origin in China.
         # See discussion here: https://fivearts.info/fivearts/index.php?topic=13681.0
 
-        self.vars['bazi_earthly'] = pd.read_csv(bazi_earthly, sep=',', index_col="S/N")
+        self.vars['bazi_earthly'] = pd.read_csv(bazi_earthly, sep=';', index_col="S/N", encoding='latin-1')
         # self.vars['bazi_earthly'].info()
 
         self.vars['bazi_heavenly'] = pd.read_csv(bazi_heavenly, sep=',', index_col="S/N")
@@ -72,7 +87,7 @@ class BaZi(Strategy):
         self.vars['bazi_seasons'] = pd.read_csv(bazi_seasons, sep=',', index_col="Numeral")
         # self.vars['bazi_seasons'].info()
 
-        self.vars['bazi_iching'] = pd.read_csv(bazi_iching, sep=';', index_col="H_E")
+        self.vars['bazi_iching'] = pd.read_csv(bazi_iching, sep=';', index_col="H_E", encoding='latin-1')
         # self.vars['bazi_iching'].info()
 
         self.vars['bazi_relationship_day_hour_stem'] = pd.read_csv(bazi_relationship_day_hour_stem, sep=';',
@@ -83,12 +98,17 @@ class BaZi(Strategy):
                                                                      index_col=[0])
         # self.vars['bazi_relationship_year_month_stem'].info()
 
-        self.vars['bazi_hour_pillar'] = pd.read_csv(bazi_hour_pillar, sep=';', index_col=[0])
+        self.vars['bazi_hour_pillar'] = pd.read_csv(bazi_hour_pillar, sep=',', index_col=[0])
         # self.vars['bazi_hour_pillar'].info()
 
         self.vars['bazi_wuxing_nayin'] = pd.read_csv(bazi_wuxing_nayin, sep=';', index_col=[0])
         # self.vars['bazi_wuxing_nayin'].info()
 
+        self.vars['flying_stars'] = FlyingStars.build(bazi_calendar)
+        self.vars['hour_pillars'] = HourPillars.build(bazi_calendar, self.vars['bazi_relationship_day_hour_stem'],
+                                                      self.vars['bazi_heavenly'], self.vars['bazi_earthly'],
+                                                      self.vars['solar_table'])
+
         m = self.vars['bazi_earthly']['Yin/Yang'].to_dict()
         m2 = self.vars['bazi_earthly']['Five Elements'].to_dict()
         export['EB of Day'] = export['EB of Day'].replace(m2)
@@ -101,10 +121,9 @@ class BaZi(Strategy):
     def before(self):
         if self.index == 0:
             self.load_bazi_data()
-
-        # Filter past data.
-        candle_date = self.current_candle_date
-        self.vars['bazi'] = self.vars['bazi'].loc[candle_date:]
+            self.vars['alignment'] = TimeframeAlignment(self.candles[0, 0], self.timeframe,
+                                                        anchor_timeframe=utils.anchor_timeframe(self.timeframe))
+            self.alignment.add_calendar('bazi', self.vars['bazi'].index)
 
     def should_long(self) -> bool:
         return self.is_bull_bazi_signal and self.vmacd > 0
@@ -205,11 +224,14 @@ class BaZi(Strategy):
         return ta.atr(self.candles, self.hp['entry_atr_period'])
 
     @property
+    @cached
     def dc(self):
-        return ta.donchian(self.candles, period=self.hp['stop_dc_period'])
+        if 'dc' not in self.vars:
+            self.vars['dc'] = IncrementalDonchian(self.hp['stop_dc_period'])
+        return self.vars['dc'].update(self.candles)
 
     def bazi_indicator_day_index(self):
-        candle_hour = self.current_candle_hour
+        candle_hour = self.current_candle_hour()
         # Use next day signal after shift hour due the fact that bazi might work shifted
         # mid price (OHLC / 4) so the price action predicted by next day is lagged.
         day_index = 0
@@ -224,7 +246,7 @@ class BaZi(Strategy):
         signals = bazi_indicator.iloc[start_index:end_index]
         count_signals = len(signals)
 
-        flying_star_of_year = self.get_flying_star(signals['HS of Year'][start_index])
+        flying_star_of_year = self.get_flying_star(self.current_candle_day() + start_index)
 
         elements = []
 
@@ -260,6 +282,8 @@ class BaZi(Strategy):
         wood_count = elements.count("Wood")
 
         score = metal_count + water_count + earth_count - fire_count - wood_count
+        # The 2-hour pillar of the candle in local solar time.
+        score += self.hp['bazi_hour_pillar_weight'] * self.hour_pillar_score
 
         if score > 0:
             return 1
@@ -291,108 +315,34 @@ class BaZi(Strategy):
         return self.vars['bazi_iching'].loc[self.vars[
                                                 'bazi_iching'].index == f'{heavenly_stem.replace("S", "")}_{earthly_branch.replace("B", "")}', 'Binary'].item()
 
-    def get_flying_star(self, center: int):
-
-        # Center -> Northwest -> West - Northeast -> South -> North -> Southwest -> East -> Southeast
-
-        print(self.flying_star_of_year)
-        current_count = center
-
-        for i in range(8):
-            current_count += 1
-            if current_count == 10:
-                current_count = 1
-            if i == 0:
-                northwest = current_count
-            elif i == 1:
-                west = current_count
-            elif i == 2:
-                northeast = current_count
-            elif i == 3:
-                south = current_count
-            elif i == 4:
-                north = current_count
-            elif i == 5:
-                southwest = current_count
-            elif i == 6:
-                east = current_count
-            elif i == 7:
-                southeast = current_count
-
-        flying_star_chart = np.array(
-            [[southeast, south, southwest],
-             [east, center, west],
-             [northeast, north, northwest]]
-        )
+    def get_flying_star(self, day: int):
+        # Annual flying star chart of the day number, see common/flying_stars.py.
+        return self.vars['flying_stars'].year_chart(day)
 
     @property
     @cached
-    def candle_stick_to_trigram(self):
-        open = self.candles[:, 1]
-        close = self.candles[:, 2]
-        high = self.candles[:, 3]
-        low = self.candles[:, 4]
-
-        bearish = close > open
-        bullish = close < open
-        # https://de.tradingview.com/script/Cwv7H00X/
-
-        # maybe use talib - as wick size / shadow percentage is important
-        if bearish and high == close and low == open:
-            # Bullish Marubozu
-            # maybe add puffer for equal
-
-            # yin == 1 yang == 0
-            trigram = "Earth"
-            symbol = [1, 1, 1]
-        elif bullish and high == open and low == close:
-            # Bearish Marubozu
-            # maybe add puffer for equal
-            trigram = "Heaven"
-            symbol = [0, 0, 0]
-        elif bearish and high == close and low < open:
-            # Bullish Hammer
-            trigram = "Mountain"
-            symbol = [0, 1, 1]
-        elif bullish and high == open and low < close:
-            # Bearish Hammer
-            trigram = "Fire"
-            symbol = [0, 1, 0]
-        elif bearish and low == open and high > close:
-            # Bullish Inverted Hammer
-            trigram = "Water"
-            symbol = [1, 0, 1]
-        elif bullish and low == close and high > open:
-            # Bearish Inverted Hammer
-            trigram = "Lake"
-            symbol = [1, 0, 0]
-        elif bearish and high > close and low < open:
-            # Bullish Spinning Top
-            trigram = "Wind"
-            symbol = [0, 0, 1]
-        elif bullish and high > open and low < close:
-            # Bearish Spinning Top
-            trigram = "Thunder"
-            symbol = [1, 1, 0]
-
-        return self.bazi_signal_period_decision(self.vars['bazi'])
+    def candle_stick_to_trigram(self) -> int:
+        # Trigram id of the current candle (Marubozu, Hammer, Inverted Hammer or Spinning Top),
+        # see common/trigrams.py, classify_trigrams() does the same for whole candle arrays.
+        return candle_trigram(self.candles[-1], self.trigram_tolerance)
 
     @property
     @cached
     def bazi_signal(self):
-        return self.bazi_signal_period_decision(self.vars['bazi'])
+        # BaZi days from the current candle date onwards.
+        row = self.alignment.calendar_row('bazi', self.candle_position)
+        return self.bazi_signal_period_decision(self.vars['bazi'].iloc[row:])
 
     def solartime(self):
         # Source for birthplace of BTC: https://astralharmony.com/blog/astrology-bitcoin-series-part-two/
         # As discussed in my previous Bitcoin article, I believe that the correct astrological birth chart for Bitcoin should be based on the Satoshi White Paper released on October 31, 2008, which I have rectified to Van Nuys, CA (11:10 AM).
-        name = "Van Nuys"
-        sun = ephem.Sun()
-        observer = ephem.city(name)
-        observer.date = '1978/10/3 11:32'
-        sun.compute(observer)
-        # sidereal time == ra (right ascension) is the highest point (noon)
-        hour_angle = observer.sidereal_time() - sun.ra
-        return ephem.hours(hour_angle + ephem.hours('12:00')).norm  # norm for 24h
+        # Local apparent solar time (hours) of the current candle, see common/ephemeris.py.
+        return self.vars['solar_table'].solar_hour(self.candles[-1, 0])
+
+    @property
+    def hour_pillar_score(self) -> int:
+        # Element score (-2 .. 2) of the 2-hour pillar of the current candle.
+        return int(self.vars['hour_pillars'].scores([self.candles[-1, 0]])[0])
 
     @property
     def is_bull_bazi_signal(self) -> bool:
@@ -407,13 +357,22 @@ class BaZi(Strategy):
         return True
 
     @property
+    @cached
     def vmacd(self):
-        return ta.vwmacd(self.candles).hist
+        return self.vars['vmacd'].update(self.candles).hist
 
     @property
     def anchor_candles(self):
         return self.get_candles(self.exchange, self.symbol, utils.anchor_timeframe(self.timeframe))
 
+    @property
+    def anchor_candle(self):
+        # The anchor timeframe candle enclosing the current candle.
+        anchor_candles = self.anchor_candles
+        if self.alignment.anchor_first_timestamp != anchor_candles[0, 0]:
+            self.alignment.set_anchor(anchor_candles[0, 0])
+        return anchor_candles[self.alignment.anchor_position(self.candle_position)]
+
     def watch_list(self):
         return [
             ('trend_direction', self.trend_direction),
@@ -440,4 +399,5 @@ class BaZi(Strategy):
             {'name': 'bazi_signal_trend_period', 'type': int, 'min': 1, 'max': 5, 'default': 2},
             {'name': 'bazi_signal_shift_hour', 'type': int, 'min': 0, 'max': 23, 'default': 0},
             {'name': 'enable_bazi_signal', 'type': int, 'min': 0, 'max': 1, 'default': 1},
+            {'name': 'bazi_hour_pillar_weight', 'type': int, 'min': 0, 'max': 3, 'default': 0},
         ]
@@ -3,8 +3,14 @@ import numpy as np
 from jesse import utils
 from jesse.strategies import Strategy, cached
 
+from common.indicators import IncrementalDonchian
+
 
 class Geomancy(Strategy):
+    warmup_indicators = (
+        ('atr', 'entry_atr_period'), ('atr', 'stop_atr_period'), ('atr', 'take_profit_atr_period'),
+        ('donchian', 'stop_dc_period'),
+    )
 
     def before(self):
         self.generate_all_symbols()
@@ -343,7 +349,9 @@ class Geomancy(Strategy):
     @property
     @cached
     def dc(self):
-        return ta.donchian(self.candles, period=self.hp['stop_dc_period'])
+        if 'dc' not in self.vars:
+            self.vars['dc'] = IncrementalDonchian(self.hp['stop_dc_period'])
+        return self.vars['dc'].update(self.candles)
 
     def watch_list(self):
         conversion_line, base_line, span_a, span_b = self.ichimoku_cloud
@@ -1,14 +1,21 @@
-from datetime import datetime
 from pathlib import Path
 
+import jesse.helpers as jh
 import jesse.indicators as ta
 import numpy as np
-import pandas as pd
 from jesse import utils
 from jesse.strategies import Strategy, cached
 
+from common.astro_signals import astro_signal_store
+from common.candle_time import CandleTimeMixin
+from common.indicators import IncrementalDonchian
 
-class IChingAstro(Strategy):
+
+class IChingAstro(CandleTimeMixin, Strategy):
+    warmup_indicators = (
+        ('atr', 'entry_atr_period'), ('atr', 'stop_atr_period'), ('atr', 'take_profit_atr_period'),
+        ('donchian', 'stop_dc_period'),
+    )
 
     def before(self):
         self.prepare_symbol()
@@ -16,9 +23,8 @@ class IChingAstro(Strategy):
         if self.index == 0:
             self.load_astro_data()
 
-            # Filter past data.
-        candle_date = self.current_candle_date()
-        self.vars['astro_asset'] = self.vars['astro_asset'].loc[candle_date:]
+        # Swap in refreshed astro signals between candles.
+        self.vars['astro_asset'].refresh()
 
     def should_long(self) -> bool:
         return self.signal == 1 and self.is_bull_astro_signal
@@ -486,18 +492,12 @@ class IChingAstro(Strategy):
         self.vars['trigram'] = trigram
         self.vars['bigram'] = bigram
 
-    def current_candle_date(self) -> datetime:
-        return datetime.fromtimestamp(self.candles[-1, 0] / 1000).replace(hour=0, minute=0, second=0, microsecond=0)
-
-    def current_candle_hour(self) -> int:
-        return datetime.fromtimestamp(self.candles[-1, 0] / 1000).hour
-
     def load_astro_data(self):
         here = Path(__file__).parent
         # Dynamically determine the right csv from the self.symbol and shift the index 1 day.
         symbol_parts = self.symbol.split('-')
         astro_asset_indicator_path = here / './ml-{}-USD-daily-index.csv'.format(symbol_parts[0])
-        self.vars['astro_asset'] = pd.read_csv(astro_asset_indicator_path, parse_dates=['Date'], index_col=0)
+        self.vars['astro_asset'] = astro_signal_store(astro_asset_indicator_path, watch=jh.is_live())
 
     def astro_indicator_day_index(self):
         candle_hour = self.current_candle_hour()
@@ -510,23 +510,17 @@ class IChingAstro(Strategy):
 
     def astro_signal_period_decision(self, astro_indicator):
         start_index = self.astro_indicator_day_index()
+        day = self.current_candle_day()
+        # Trends where a signal won by less than N model votes are too weak, see AstroSignals.margins().
+        if astro_indicator.margins(day, start_index, self.hp['astro_signal_trend_period'])[0] < \
+                self.hp['astro_signal_min_margin']:
+            return 'neutral'
         # Select next N signals in order to determine that there is astro energy trend.
-        end_index = start_index + self.hp['astro_signal_trend_period']
-        signals = astro_indicator.iloc[start_index:end_index]
-        count_signals = len(signals)
-        buy_signals = signals[signals['Action'] == 'buy']
-        sell_signals = signals[signals['Action'] == 'sell']
-
-        if (count_signals == len(buy_signals)):
-            return 'buy'
-        elif (count_signals == len(sell_signals)):
-            return 'sell'
-
-        return 'neutral'
+        return astro_indicator.decision(day, start_index, self.hp['astro_signal_trend_period'])
 
     @property
     def astro_asset_signal(self):
-        return self.astro_signal_period_decision(self.vars['astro_asset'])
+        return self.astro_signal_period_decision(self.vars['astro_asset'].signals_at(self.candles[-1, 0]))
 
     @property
     def is_bull_astro_signal(self) -> bool:
@@ -544,6 +538,14 @@ class IChingAstro(Strategy):
     def anchor_candles(self):
         return self.get_candles(self.exchange, self.symbol, "1D")
 
+    @property
+    def anchor_candle(self):
+        # The 1D candle enclosing the current candle.
+        anchor_candles = self.anchor_candles
+        if self.alignment.anchor_first_timestamp != anchor_candles[0, 0]:
+            self.alignment.set_anchor(anchor_candles[0, 0])
+        return anchor_candles[self.alignment.anchor_position(self.candle_position)]
+
     @property
     @cached
     def take_profit_atr(self):
@@ -562,7 +564,9 @@ class IChingAstro(Strategy):
     @property
     @cached
     def dc(self):
-        return ta.donchian(self.candles, period=self.hp['stop_dc_period'])
+        if 'dc' not in self.vars:
+            self.vars['dc'] = IncrementalDonchian(self.hp['stop_dc_period'])
+        return self.vars['dc'].update(self.candles)
 
     def sum_digits(self, integ):
         if integ == np.nan:
@@ -592,6 +596,8 @@ class IChingAstro(Strategy):
             {'name': 'max_day_attempts', 'type': int, 'min': 1, 'max': 5, 'default': 4},
             {'name': 'astro_signal_trend_period', 'type': int, 'min': 1, 'max': 5, 'default': 2},
             {'name': 'astro_signal_shift_hour', 'type': int, 'min': 0, 'max': 23, 'default': 4},
+            {'name': 'astro_signal_min_margin', 'type': int, 'min': 0, 'max': 7, 'default': 0},
             {'name': 'enable_astro_signal', 'type': int, 'min': 0, 'max': 1, 'default': 1},
             {'name': 'symbol_method', 'type': int, min: 0, max: 1, 'default': 0},
+            {'name': 'stop_dc_period', 'type': int, 'min': 10, 'max': 50, 'default': 20},
         ]
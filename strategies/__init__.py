@@ -0,0 +1,23 @@
+import importlib
+
+# Strategies by route name. The modules, and the dependencies they pull in, are only imported when a
+# route first asks for them, so a single route backtest doesn't load the other strategies.
+STRATEGIES = ('AstroStrategyMA', 'AstroStrategyRSI', 'AstroSunStrategyMA', 'BaZi', 'Geomancy', 'IChingAstro')
+
+
+def strategy_class(name: str):
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {name}, expected one of: {', '.join(STRATEGIES)}")
+    return getattr(importlib.import_module(f'{__name__}.{name}'), name)
+
+
+def route_strategies(routes: list) -> dict:
+    # Strategy classes of the (exchange, symbol, timeframe, strategy) routes, e.g. routes.routes.
+    return {route[3]: strategy_class(route[3]) for route in routes}
+
+
+def __getattr__(name: str):
+    # strategies.BaZi imports the module on first access.
+    if name in STRATEGIES:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
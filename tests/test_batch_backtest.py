@@ -0,0 +1,105 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.astro_signals import AstroSignals, SignalVersions, signal_rows
+from common.batch_backtest import AstroMABatch
+from strategies import strategy_class
+
+EXCHANGE = 'Binance Spot'
+SYMBOL = 'BTC-USDT'
+CAPITAL = 10_000
+FEE = 0.001
+WARMUP = 279
+SIGNALS_PATH = Path(__file__).parent.parent / 'strategies' / 'AstroStrategyMA' / 'ml-BTC-USD-daily-index.csv'
+
+# Hyperparameters changed from the defaults, covering the astro filter, the MAs, the attempts and the exits.
+VARIANTS = [
+    {},
+    {'enable_astro_signal': 0},
+    {'slow_ma_period': 90, 'fast_ma_devider': 6.5},
+    {'astro_signal_shift_hour': 18, 'astro_signal_trend_period': 1, 'max_day_attempts': 1},
+    {'entry_stop_atr_rate': 0.6, 'stop_loss_atr_rate': 1.5, 'take_profit_atr_rate': 5, 'astro_signal_min_margin': 2},
+]
+
+
+@pytest.fixture(scope='module')
+def minute_candles():
+    # 60 days of 1m candles of a random walk from 2021-01-01.
+    rng = np.random.default_rng(3)
+    size = 60 * 1440
+    closes = 30_000 * np.exp(np.cumsum(rng.normal(0, 0.0015, size)))
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    highs = np.maximum(opens, closes) * (1 + rng.random(size) * 0.0008)
+    lows = np.minimum(opens, closes) * (1 - rng.random(size) * 0.0008)
+    timestamps = 1_609_459_200_000 + np.arange(size) * 60_000
+    return np.column_stack((timestamps, opens, closes, highs, lows, rng.uniform(1, 10, size)))
+
+
+def candles_of(minute_candles: np.ndarray, minutes: int = 15) -> np.ndarray:
+    bars = minute_candles.reshape(-1, minutes, 6)
+    return np.column_stack((bars[:, 0, 0], bars[:, 0, 1], bars[:, -1, 2], bars[:, :, 3].max(axis=1),
+                            bars[:, :, 4].min(axis=1), bars[:, :, 5].sum(axis=1)))
+
+
+def jesse_backtest(minute_candles: np.ndarray, hp: dict) -> dict:
+    # Imported here, jesse.research needs the test runner to skip the database.
+    from jesse import research
+
+    config = {'starting_balance': CAPITAL, 'fee': FEE, 'type': 'futures', 'futures_leverage': 1,
+              'futures_leverage_mode': 'cross', 'exchange': EXCHANGE, 'warm_up_candles': WARMUP}
+    routes = [{'exchange': EXCHANGE, 'strategy': strategy_class('AstroStrategyMA'), 'symbol': SYMBOL, 'timeframe': '15m'}]
+    warmup = WARMUP * 15
+
+    def route_candles(candles):
+        return {f'{EXCHANGE}-{SYMBOL}': {'exchange': EXCHANGE, 'symbol': SYMBOL, 'candles': candles}}
+
+    return research.backtest(config, routes, [], route_candles(minute_candles[warmup:]),
+                             warmup_candles=route_candles(minute_candles[:warmup]), hyperparameters=hp)['metrics']
+
+
+def test_the_batch_matches_single_jesse_backtests(minute_candles):
+    defaults = {parameter['name']: parameter['default']
+                for parameter in strategy_class('AstroStrategyMA').hyperparameters(None)}
+    candidates = [dict(defaults, **variant) for variant in VARIANTS]
+    astro_asset = pd.read_csv(SIGNALS_PATH, parse_dates=['Date'], index_col=0)
+    batch = AstroMABatch(candles_of(minute_candles), astro_asset, capital=CAPITAL, fee_rate=FEE,
+                         warmup_candles_num=WARMUP, minute_candles=minute_candles)
+    result = batch.run(candidates)
+
+    for i, hp in enumerate(candidates):
+        metrics = jesse_backtest(minute_candles, hp)
+        assert result.trades[i] == metrics['total']
+        assert abs((result.balance[i] - CAPITAL) / CAPITAL * 100 - metrics['net_profit_percentage']) < 0.005
+
+
+def test_the_batch_reads_the_vintage_published_by_each_bar(minute_candles):
+    candles = candles_of(minute_candles)
+    astro_asset = pd.read_csv(SIGNALS_PATH, parse_dates=['Date'], index_col=0)
+    rows = signal_rows(AstroSignals.from_frame(astro_asset))
+    # A refit turning every forecast bearish, published in the middle of the candles.
+    bearish = dict(rows, buy=np.minimum(rows['buy'], rows['sell']), sell=np.maximum(rows['buy'], rows['sell']) + 1,
+                   action=np.full_like(rows['action'], -1))
+    middle = len(candles) // 2
+    candidates = [{parameter['name']: parameter['default']
+                   for parameter in strategy_class('AstroStrategyMA').hyperparameters(None)}]
+
+    def run(published, vintages):
+        deltas = {column: np.concatenate([vintage[column] for vintage in vintages]) for column in rows}
+        offsets = np.cumsum([0] + [len(vintage['days']) for vintage in vintages])
+        versions = SignalVersions('BTC', np.array(published), offsets, deltas)
+        return AstroMABatch(candles, astro_asset, warmup_candles_num=WARMUP, versions=versions).run(
+            candidates, keep_log=True)
+
+    current = AstroMABatch(candles, astro_asset, warmup_candles_num=WARMUP).run(candidates, keep_log=True)
+    assert run([candles[0, 0]], [rows]).log == current.log
+
+    # The refit changes every row, so its vintage is all bearish and no entry is placed after it.
+    refit = run([candles[0, 0], candles[middle, 0]], [rows, bearish])
+    assert refit.log == [trade for trade in current.log if trade[1] <= middle]
+    assert 0 < len(refit.log) < len(current.log)
+
+    with pytest.raises(ValueError, match='No astro signals vintage'):
+        run([candles[-1, 0]], [rows])
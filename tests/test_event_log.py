@@ -0,0 +1,91 @@
+import gzip
+import json
+import threading
+
+from common.event_log import EventLog, RotatingJsonlSink
+
+
+class BlockingSink:
+    # Holds the writer inside write() until released, so the queue fills up.
+
+    def __init__(self, failures: int = 0):
+        self.lines = []
+        self.failures = failures
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.closed = False
+
+    def write(self, lines: list):
+        self.entered.set()
+        self.release.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('collector went away')
+        self.lines.extend(lines)
+
+    def close(self):
+        self.closed = True
+
+
+def written(sink: BlockingSink) -> list:
+    return [json.loads(line) for line in sink.lines]
+
+
+def test_noisy_events_are_sampled_under_pressure_and_the_others_dropped_when_full():
+    sink = BlockingSink()
+    events = EventLog(sink, capacity=10)
+    events.log('position_opened')
+    sink.entered.wait(5)
+
+    # Half full, the pressure threshold.
+    assert all(events.log('position_opened') for _ in range(5))
+    # 1 in 5 balance updates is kept.
+    assert [events.log('balance_update', balance=i) for i in range(10)] == ([False] * 4 + [True]) * 2
+    # The order and position events still get in until the queue is full.
+    assert [events.log('position_closed') for _ in range(5)] == [True] * 3 + [False] * 2
+
+    sink.release.set()
+    events.close()
+    records = written(sink)
+    assert [record['balance'] for record in records if record['category'] == 'balance_update'] == [4, 9]
+    assert {'sampled': {'balance_update': 8}, 'dropped': {'position_closed': 2}} in \
+        [{'sampled': record['sampled'], 'dropped': record['dropped']}
+         for record in records if record['category'] == 'event_log_dropped']
+    assert sink.closed
+
+
+def test_a_failing_sink_doesnt_stop_the_writer():
+    sink = BlockingSink(failures=1)
+    sink.release.set()
+    events = EventLog(sink)
+    events.log('position_opened', n=1)
+    sink.entered.wait(5)
+    events.log('position_opened', n=2)
+    events.close()
+
+    records = written(sink)
+    assert [record.get('n') for record in records if record['category'] == 'position_opened'] == [2]
+    assert records[-1]['dropped'] == {'write_error': 1}
+
+
+def test_close_leaves_the_sink_of_a_busy_writer_open():
+    sink = BlockingSink()
+    events = EventLog(sink)
+    events.log('position_opened')
+    sink.entered.wait(5)
+
+    events.close(timeout=0.1)
+    assert not sink.closed
+    sink.release.set()
+
+
+def test_the_files_rotate_and_only_the_newest_are_kept(tmp_path):
+    sink = RotatingJsonlSink(tmp_path, max_bytes=100, keep=2)
+    for i in range(5):
+        sink.write([json.dumps({'batch': i, 'padding': 'x' * 50}) + '\n'])
+    sink.close()
+
+    files = sorted(tmp_path.glob('events-*.jsonl.gz'))
+    assert len(files) == 2
+    batches = [[json.loads(line)['batch'] for line in gzip.open(file, 'rt')] for file in files]
+    assert batches == [[2, 3], [4]]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from common.ephemeris import DAY_MS, OBSERVERS, SolarTable
+from common.features import read_bazi_calendar
+from common.hour_pillars import HOUR_MS, HourPillars
+
+# 2021-01-01
+DAY = 18628
+
+
+@pytest.fixture(scope='module')
+def bazi():
+    return read_bazi_calendar()
+
+
+@pytest.fixture(scope='module')
+def solar(bazi):
+    # Van Nuys with a made up equation of time, no ephem needed.
+    first_day = int(bazi['calendar'].index.values[0].astype('datetime64[D]').astype(np.int64))
+    days = len(bazi['calendar'])
+    equation_of_time = np.full(days, 10, dtype=np.float32)
+    longitude = OBSERVERS['Van Nuys'][1]
+    return SolarTable(longitude, first_day, np.zeros(days, dtype=np.float32), equation_of_time,
+                      (720 - longitude * 4 - equation_of_time).astype(np.float32))
+
+
+def pillars(bazi, solar=None) -> HourPillars:
+    return HourPillars.build(bazi['calendar'], bazi['day_hour_stem'], bazi['heavenly'], bazi['earthly'], solar)
+
+
+def local_time(solar: SolarTable, day: int, hours: float) -> int:
+    # UTC timestamp of the local solar time.
+    return int(day * DAY_MS + hours * HOUR_MS - (solar.longitude * 4 + 10) * 60_000)
+
+
+def test_the_zi_hour_starts_at_23_local_solar_time(bazi, solar):
+    hour_pillars = pillars(bazi, solar)
+    utc_pillars = pillars(bazi)
+
+    assert solar.solar_hour(local_time(solar, DAY, 23.5)) == pytest.approx(23.5)
+    # Hai hour of the day, then the Zi hour opening the next day.
+    assert hour_pillars.pillar(local_time(solar, DAY, 22.5)) == utc_pillars.pillar(DAY * DAY_MS + 22.5 * HOUR_MS)
+    assert hour_pillars.pillar(local_time(solar, DAY, 22.5))[1] == 12
+    assert hour_pillars.pillar(local_time(solar, DAY, 23.5)) == utc_pillars.pillar((DAY + 1) * DAY_MS + 0.5 * HOUR_MS)
+    assert hour_pillars.pillar(local_time(solar, DAY, 23.5))[1] == 1
+
+
+def test_utc_23_is_an_afternoon_hour_in_van_nuys(bazi, solar):
+    hour_pillars = pillars(bazi, solar)
+    # 23:00 UTC is about 15:00 local solar time, the Shen hour.
+    assert hour_pillars.pillar(DAY * DAY_MS + 23 * HOUR_MS)[1] == 9
+
+    timestamps = DAY * DAY_MS + np.arange(48) * HOUR_MS
+    assert np.array_equal(hour_pillars.scores(timestamps), pillars(bazi).scores(solar.solar_times(timestamps)))
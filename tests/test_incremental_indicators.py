@@ -0,0 +1,63 @@
+import jesse.indicators as ta
+import numpy as np
+import pytest
+
+from common.indicators import IncrementalADX, IncrementalDonchian, IncrementalIFTRSI, IncrementalVWMACD
+
+WARMUP = 60
+
+
+@pytest.fixture(scope='module')
+def candles():
+    # 15m candles of a random walk with a flat price segment in the middle.
+    rng = np.random.default_rng(7)
+    size = 600
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, size)))
+    closes[300:320] = closes[299]
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    highs = np.maximum(opens, closes) * (1 + rng.random(size) * 0.002)
+    lows = np.minimum(opens, closes) * (1 - rng.random(size) * 0.002)
+    volumes = rng.uniform(10, 1000, size)
+    timestamps = 1_609_459_200_000 + np.arange(size) * 900_000
+    return np.column_stack((timestamps, opens, closes, highs, lows, volumes))
+
+
+def bar_by_bar(indicator, candles: np.ndarray) -> list:
+    # Value after each candle, fed the way the strategies do with the growing candles array.
+    return [indicator.update(candles[:i + 1]) for i in range(len(candles))]
+
+
+def test_ift_rsi_matches_the_sequential_jesse_indicator(candles):
+    expected = ta.ift_rsi(candles, sequential=True)
+    values = bar_by_bar(IncrementalIFTRSI(), candles)
+
+    for i in range(WARMUP, len(candles)):
+        assert np.allclose(values[i], expected[i - 1:i + 1])
+
+
+def test_vwmacd_matches_the_sequential_jesse_indicator(candles):
+    expected = ta.vwmacd(candles, sequential=True)
+    values = bar_by_bar(IncrementalVWMACD(), candles)
+
+    assert np.allclose([value.macd for value in values[WARMUP:]], expected.macd[WARMUP:])
+    assert np.allclose([value.signal for value in values[WARMUP:]], expected.signal[WARMUP:])
+    assert np.allclose([value.hist for value in values[WARMUP:]], expected.hist[WARMUP:])
+
+
+@pytest.mark.parametrize('period', [2, 14, 41])
+def test_donchian_matches_the_sequential_jesse_indicator(candles, period):
+    expected = ta.donchian(candles, period, sequential=True)
+    values = bar_by_bar(IncrementalDonchian(period), candles)
+
+    assert np.allclose([value.upperband for value in values[WARMUP:]], expected.upperband[WARMUP:])
+    assert np.allclose([value.middleband for value in values[WARMUP:]], expected.middleband[WARMUP:])
+    assert np.allclose([value.lowerband for value in values[WARMUP:]], expected.lowerband[WARMUP:])
+
+
+def test_adx_matches_the_jesse_indicator_on_the_strategy_window(candles):
+    # The strategies called ta.adx(candles) on the last 240 candles, the incremental ADX sees the whole
+    # history and starts one candle earlier, so both only agree once the seeding has decayed.
+    values = bar_by_bar(IncrementalADX(), candles)
+
+    for i in range(240, len(candles)):
+        assert np.isclose(values[i], ta.adx(candles[i - 239:i + 1]), rtol=0, atol=1e-4)
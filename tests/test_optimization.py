@@ -0,0 +1,88 @@
+import importlib
+import itertools
+
+import numpy as np
+
+from common.optimization import canonical_key, deduplicated_trials
+from strategies import strategy_class
+
+EXCHANGE = 'Binance Perpetual Futures'
+SYMBOL = 'BTC-USDT'
+WARMUP = 279
+
+
+def minute_candles(days: int, start: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    size = days * 1440
+    closes = 30_000 * np.exp(np.cumsum(rng.normal(0, 0.0015, size)))
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    highs = np.maximum(opens, closes) * (1 + rng.random(size) * 0.0008)
+    lows = np.minimum(opens, closes) * (1 - rng.random(size) * 0.0008)
+    timestamps = start + np.arange(size) * 60_000
+    return np.column_stack((timestamps, opens, closes, highs, lows, rng.uniform(1, 10, size)))
+
+
+def route_candles(candles: np.ndarray) -> dict:
+    return {f'{EXCHANGE}-{SYMBOL}': {'exchange': EXCHANGE, 'symbol': SYMBOL, 'candles': candles}}
+
+
+def test_an_astro_setting_of_a_disabled_filter_is_not_in_the_key():
+    strategy = strategy_class('AstroStrategyMA')
+    defaults = {parameter['name']: parameter['default'] for parameter in strategy.hyperparameters(None)}
+    disabled = dict(defaults, enable_astro_signal=0)
+
+    assert canonical_key(disabled, strategy) == canonical_key(dict(disabled, astro_signal_shift_hour=20), strategy)
+    assert canonical_key(defaults, strategy) != canonical_key(dict(defaults, astro_signal_shift_hour=20), strategy)
+
+    # The breadth filter still reads the shift hour.
+    class BreadthStrategy(strategy):
+        min_long_breadth = 0.5
+
+    assert canonical_key(disabled, BreadthStrategy) != \
+        canonical_key(dict(disabled, astro_signal_shift_hour=20), BreadthStrategy)
+    assert canonical_key(disabled, BreadthStrategy) == \
+        canonical_key(dict(disabled, astro_signal_trend_period=1), BreadthStrategy)
+
+
+def test_the_research_optimizer_backtests_duplicated_trials_once(monkeypatch):
+    # Imported here, jesse.research needs the test runner to skip the database. The module, the
+    # package exports its optimize() function under the same name.
+    research_optimize = importlib.import_module('jesse.research.optimize')
+
+    strategy = strategy_class('AstroStrategyMA')
+    defaults = {parameter['name']: parameter['default'] for parameter in strategy.hyperparameters(None)}
+    disabled = dict(defaults, enable_astro_signal=0)
+    # Three distinct backtests, the other trials only move astro settings of the disabled filter.
+    trials = itertools.cycle([defaults, disabled, dict(disabled, astro_signal_shift_hour=20),
+                              dict(defaults, slow_ma_period=90), dict(disabled, astro_signal_trend_period=1)])
+    monkeypatch.setattr(research_optimize, '_generate_trial_params', lambda strategy_hp: dict(next(trials)))
+    # Under the test runner jesse looks its own test strategies up by name, the route passes the class.
+    monkeypatch.setattr(research_optimize.jh, 'get_strategy_class', lambda strategy: strategy)
+
+    training = minute_candles(30, 1_609_459_200_000, 5)
+    testing = minute_candles(20, int(training[-1, 0]) + 60_000, 4)
+    warmup = WARMUP * 15
+    config = {'exchange': {'name': EXCHANGE, 'balance': 10_000, 'fee': 0.001, 'type': 'futures',
+                           'futures_leverage': 1, 'futures_leverage_mode': 'cross'},
+              'warm_up_candles': WARMUP}
+    routes = [{'strategy': strategy, 'symbol': SYMBOL, 'timeframe': '15m'}]
+
+    with deduplicated_trials(strategy) as deduplicated:
+        result = research_optimize.optimize(
+            config, routes, [], route_candles(training[warmup:]), route_candles(training[:warmup]),
+            route_candles(testing[warmup:]), route_candles(testing[:warmup]),
+            optimal_total=20, cpu_cores=1, trials=1, progress_bar=False)
+
+    total = len(defaults)
+    assert result['completed_trials'] == total
+    assert (deduplicated.misses, deduplicated.hits) == (3, total - 3)
+
+    # A duplicate carries its own trial number and hp, with the metrics of the first one.
+    groups = {}
+    for trial in result['best_trials']:
+        groups.setdefault(canonical_key(trial['params'], strategy), []).append(trial)
+    assert any(len(group) > 1 for group in groups.values())
+    for group in groups.values():
+        assert len({trial['trial'] for trial in group}) == len(group)
+        assert all(trial['fitness'] == group[0]['fitness'] for trial in group)
+        assert all(trial['training_metrics'] == group[0]['training_metrics'] for trial in group)
@@ -0,0 +1,99 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common import astro_signals
+from common.astro_signals import AstroSignals, AstroSignalStore, SignalVersions
+
+
+@pytest.fixture(autouse=True)
+def versions_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(astro_signals, 'VERSIONS_PATH', tmp_path / 'signal_versions')
+
+
+def write_signals(path, actions: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frame = pd.DataFrame({'buy': [4 if action == 'b' else 2 for action in actions],
+                          'sell': [2 if action == 'b' else 4 for action in actions],
+                          'Action': ['buy' if action == 'b' else 'sell' for action in actions]},
+                         index=pd.date_range('2021-01-01', periods=len(actions), name='Date'))
+    frame.to_csv(path)
+    return path
+
+
+def test_every_strategy_directory_has_its_own_history(tmp_path):
+    ma = write_signals(tmp_path / 'AstroStrategyMA' / 'ml-BTC-USD-daily-index.csv', 'bbss')
+    rsi = write_signals(tmp_path / 'AstroStrategyRSI' / 'ml-BTC-USD-daily-index.csv', 'ssbb')
+
+    SignalVersions.record(ma, AstroSignals.read_csv(ma), 1000)
+    SignalVersions.record(rsi, AstroSignals.read_csv(rsi), 2000)
+
+    assert SignalVersions.key_of(ma) != SignalVersions.key_of(rsi)
+    assert np.array_equal(SignalVersions.load(SignalVersions.key_of(ma)).at(1000).action, [1, 1, -1, -1])
+    assert np.array_equal(SignalVersions.load(SignalVersions.key_of(rsi)).at(2000).action, [-1, -1, 1, 1])
+
+
+def test_concurrent_records_keep_every_vintage(tmp_path):
+    paths = [write_signals(tmp_path / 'AstroStrategyMA' / 'ml-BTC-USD-daily-index.csv', 'bbbb')]
+    SignalVersions.record(paths[0], AstroSignals.read_csv(paths[0]), 0)
+    signals = [AstroSignals.read_csv(write_signals(tmp_path / f'{i}.csv', 'bbbb'[:i] + 'ssss'[i:]))
+               for i in range(4)]
+
+    errors = []
+
+    def record(i):
+        try:
+            SignalVersions.record(paths[0], signals[i], 1000 * (i + 1))
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=record, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Out of order vintages are refused, the others are all in the saved history.
+    versions = SignalVersions.load(SignalVersions.key_of(paths[0]))
+    assert len(versions.published) + len(errors) == 5
+    assert list(versions.published) == sorted(versions.published)
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.errors = []
+
+    def info(self, message):
+        pass
+
+    def error(self, message):
+        self.errors.append(message)
+
+
+def test_a_refused_vintage_doesnt_stop_the_watcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(astro_signals, 'logger', RecordingLogger())
+    path = write_signals(tmp_path / 'AstroStrategyMA' / 'ml-BTC-USD-daily-index.csv', 'bbbb')
+    store = AstroSignalStore(path)
+    # Another process already recorded a later vintage.
+    SignalVersions.record(path, AstroSignals.read_csv(path), 10 ** 15)
+
+    write_signals(path, 'ssss')
+    os.utime(path, (1000, 1000))
+    store.check()
+
+    assert np.array_equal(store.latest.action, [-1, -1, -1, -1])
+    assert 'already has a vintage published after' in astro_signals.logger.errors[0]
+
+
+def test_no_vintage_is_read_before_the_first_one_was_published(tmp_path):
+    path = write_signals(tmp_path / 'AstroStrategyMA' / 'ml-BTC-USD-daily-index.csv', 'bbbb')
+    SignalVersions.record(path, AstroSignals.read_csv(path), 1000)
+    store = AstroSignalStore(path)
+
+    assert store.versions.at(999) is None
+    assert store.signals_at(1000) is store.versions.vintages[0]
+    with pytest.raises(ValueError, match='No vintage'):
+        store.signals_at(999)
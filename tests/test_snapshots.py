@@ -0,0 +1,90 @@
+import jesse.indicators as ta
+import numpy as np
+import pytest
+
+from common.indicators import IncrementalADX
+from common.snapshots import SnapshotMixin, restart_warmup
+
+WARMUP = 279
+TIMEFRAME_MS = 900_000
+
+
+class Route(SnapshotMixin):
+    # The parts of a live strategy the snapshots use.
+    exchange, symbol, timeframe = 'Binance', 'BTC-USDT', '15m'
+    snapshot_vars = ('adx',)
+
+    def __init__(self):
+        self.vars = {'adx': IncrementalADX()}
+        self.index = 0
+        self.candles = None
+
+    def run(self, candles: np.ndarray, start: int, stop: int) -> list:
+        # Indicator values of the candles start to stop, the ones before them being the warmup.
+        values = []
+        for i in range(start, stop):
+            self.candles = candles[:i + 1]
+            values.append((self.window_atr(14), self.window_sma(100)[-2:], self.vars['adx'].update(self.candles)))
+            self.save_snapshot()
+            self.index += 1
+        return values
+
+
+@pytest.fixture
+def candles():
+    rng = np.random.default_rng(11)
+    size = 900
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, size)))
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    highs = np.maximum(opens, closes) * (1 + rng.random(size) * 0.002)
+    lows = np.minimum(opens, closes) * (1 - rng.random(size) * 0.002)
+    timestamps = 1_609_459_200_000 + np.arange(size) * TIMEFRAME_MS
+    return np.column_stack((timestamps, opens, closes, highs, lows, rng.uniform(10, 1000, size)))
+
+
+@pytest.fixture
+def live(monkeypatch, tmp_path):
+    from jesse.config import config
+
+    monkeypatch.setattr('common.snapshots.SNAPSHOTS_PATH', tmp_path)
+    monkeypatch.setattr('jesse.helpers.is_live', lambda: True)
+    monkeypatch.setitem(config['env']['data'], 'warmup_candles_num', WARMUP)
+    return config
+
+
+def test_the_window_gives_the_jesse_values(live, candles):
+    values = Route().run(candles, WARMUP, len(candles))
+
+    for i, (atr, sma, _) in enumerate(values, WARMUP):
+        assert atr == ta.atr(candles[:i + 1], period=14)
+        assert np.array_equal(sma, ta.sma(candles[:i + 1][-240:], period=100, sequential=True)[-2:])
+
+
+def test_a_restored_route_only_needs_the_candles_since_its_snapshot(live, candles):
+    snapshot, restart, finish = 600, 640, len(candles)
+    uninterrupted = Route()
+    uninterrupted.run(candles, WARMUP, snapshot + 1)
+
+    # Restarted when candle restart opens, with the candles since the snapshot as the warmup.
+    warmup = restart_warmup([('Binance', 'BTC-USDT', '15m', 'Route')], now=candles[restart, 0])
+    assert warmup == restart - snapshot + 2
+    live['env']['data']['warmup_candles_num'] = warmup
+    session = candles[restart - warmup:]
+    restored = Route()
+    restored.candles = session[:warmup + 1]
+    assert restored.restore_snapshot()
+    adx_count = restored.vars['adx'].count
+    values = restored.run(session, warmup, len(session))
+    expected = uninterrupted.run(candles, snapshot + 1, finish)[restart - snapshot - 1:]
+
+    assert len(values) == len(expected) == finish - restart
+    for (atr, sma, adx), (expected_atr, expected_sma, expected_adx) in zip(values, expected):
+        assert atr == expected_atr
+        assert np.array_equal(sma, expected_sma)
+        assert adx == expected_adx
+    # The ADX only caught up with the candles after the snapshot.
+    assert restored.vars['adx'].count == adx_count + finish - snapshot - 1 == uninterrupted.vars['adx'].count
+
+
+def test_a_route_without_snapshot_needs_the_full_warmup(live, candles):
+    assert restart_warmup([('Binance', 'BTC-USDT', '15m', 'Route')], now=candles[-1, 0]) is None
@@ -0,0 +1,35 @@
+import pytest
+
+from common.sessions import session_config
+from common.warmup import LOOKBACKS, apply_warmup, settle_candles, warmup_candles_num, warmup_plan
+from strategies import STRATEGIES, strategy_class
+
+
+@pytest.mark.parametrize('name', STRATEGIES)
+def test_every_strategy_has_a_warmup_plan(name):
+    strategy = strategy_class(name)
+    plan = warmup_plan(strategy)
+    assert plan.candles > 0
+    assert plan.days >= 0
+
+    # The hp values of the defaults never need more than the top of the ranges.
+    defaults = {parameter['name']: parameter['default'] for parameter in strategy.hyperparameters(None)}
+    assert warmup_plan(strategy, defaults).candles <= plan.candles
+
+
+def test_wilder_indicators_wait_for_their_seed_to_settle():
+    assert settle_candles(1) == 0
+    assert LOOKBACKS['atr'](50) == 51 + settle_candles(50)
+    assert LOOKBACKS['atr'](50) > LOOKBACKS['sma'](100)
+
+
+def test_the_sessions_start_with_the_warmup_of_the_routes(monkeypatch):
+    from jesse.config import config
+
+    monkeypatch.setitem(config['env']['data'], 'warmup_candles_num', 210)
+    routes = [('Binance', 'BTC-USDT', '15m', 'AstroStrategyMA')]
+    user_config = {'warm_up_candles': 210}
+
+    assert apply_warmup(user_config, routes) == warmup_candles_num(routes) > 210
+    assert user_config['warm_up_candles'] == config['env']['data']['warmup_candles_num'] == warmup_candles_num(routes)
+    assert session_config(routes)['warm_up_candles'] == warmup_candles_num(routes)
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common.batch_backtest import AstroMABatch
+from common.intrabar import bar_candles
+from common.optimization import random_candidates
+from common.worker_pool import BatchPool
+from strategies import strategy_class
+
+SIGNALS_PATH = Path(__file__).parent.parent / 'strategies' / 'AstroStrategyMA' / 'ml-BTC-USD-daily-index.csv'
+
+
+def minute_candles(days: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    size = days * 1440
+    closes = 30_000 * np.exp(np.cumsum(rng.normal(0, 0.0015, size)))
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    highs = np.maximum(opens, closes) * (1 + rng.random(size) * 0.0008)
+    lows = np.minimum(opens, closes) * (1 - rng.random(size) * 0.0008)
+    timestamps = 1_609_459_200_000 + np.arange(size) * 60_000
+    return np.column_stack((timestamps, opens, closes, highs, lows, rng.uniform(1, 10, size)))
+
+
+def trades(log: list) -> list:
+    return sorted(log, key=lambda trade: (trade[2], trade[0]))
+
+
+def test_the_pool_runs_match_serial_runs():
+    minutes = minute_candles(40, 7)
+    astro_asset = pd.read_csv(SIGNALS_PATH, parse_dates=['Date'], index_col=0)
+    batch = AstroMABatch(bar_candles(minutes, 15), astro_asset, warmup_candles_num=279, minute_candles=minutes)
+    candidates = random_candidates(strategy_class('AstroStrategyMA'), 40, np.random.default_rng(1))
+
+    with BatchPool(batch, processes=3) as pool:
+        workers = [process.pid for process in pool.pool._pool]
+        for run in (candidates[:25], candidates[25:]):
+            parallel = pool.run(run, keep_log=True)
+            serial = batch.run(run, keep_log=True)
+
+            assert np.array_equal(parallel.balance, serial.balance)
+            assert np.array_equal(parallel.trades, serial.trades)
+            assert np.array_equal(parallel.wins, serial.wins)
+            assert parallel.log == trades(serial.log)
+            assert len(parallel.log) == serial.trades.sum() > 0
+        # Both runs went to the workers forked for the first one.
+        assert [process.pid for process in pool.pool._pool] == workers